@@ -0,0 +1,46 @@
+"""Measure memory held by parsed entries, with and without string interning.
+
+Usage: python benchmarks/bench_intern.py [count]
+"""
+import sys
+import time
+import tracemalloc
+from costflow import Costflow
+from costflow.config import Config
+from costflow.workload import Workload
+
+
+def make_lines(count):
+    workload = Workload(seed=0, mix={"transaction": 4, "split": 1, "pipe": 1}, accounts=300)
+    return list(workload.lines(count))
+
+
+def bench(name, lines, intern_strings):
+    costflow = Costflow(Config(), intern_strings=intern_strings)
+    start = time.perf_counter()
+    entries = [costflow.parse(line) for line in lines]
+    elapsed = time.perf_counter() - start
+
+    # Tracing slows parsing down, so measure memory in another pass
+    if costflow.strings is not None:
+        costflow.strings.clear()
+    del entries
+    tracemalloc.start()
+    entries = [costflow.parse(line) for line in lines]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Equality checks, like dedupe and aggregation do
+    accounts = [posting.account for entry in entries for posting in entry.postings]
+    start = time.perf_counter()
+    sum(a == b for a, b in zip(accounts, accounts[1:]))
+    compare = time.perf_counter() - start
+    print(f"{name:<10} parse {elapsed:6.2f} s  held {size / 1024 / 1024:8.2f} MiB  compare {compare * 1000:6.1f} ms")
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    lines = make_lines(count)
+    print(f"{count} lines")
+    bench("plain", lines, False)
+    bench("interned", lines, True)
@@ -0,0 +1,30 @@
+"""Parse throughput on a seeded synthetic workload, overall and by line kind.
+
+Usage: python benchmarks/bench_parse.py [count] [seed]
+"""
+import sys
+import time
+from collections import defaultdict
+from costflow import Costflow
+from costflow.workload import Workload
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    workload = Workload(seed)
+    pairs = list(workload.kinds(count))
+    costflow = Costflow(workload.config())
+
+    times = defaultdict(float)
+    counts = defaultdict(int)
+    for kind, line in pairs:
+        start = time.perf_counter()
+        costflow.parse(line)
+        times[kind] += time.perf_counter() - start
+        counts[kind] += 1
+
+    total = sum(times.values())
+    print(f"{count} lines (seed {seed}): {total:.2f} s, {count / total:.0f} lines/s")
+    for kind in sorted(times, key=times.get, reverse=True):
+        print(f"  {kind:<18} {counts[kind]:>7} lines  {times[kind] / counts[kind] * 1e6:8.1f} us/line")
@@ -0,0 +1,54 @@
+"""Compare the JSON codecs with pickle on a batch of entries.
+
+Usage: python benchmarks/bench_serialize.py [count]
+"""
+import pickle
+import sys
+import timeit
+from datetime import date
+from decimal import Decimal
+from costflow import serialize
+from costflow.definitions import (
+    Balance, Narration, Payee, Posting, Transaction,
+)
+
+
+def make_entries(count):
+    entries = []
+    for i in range(count):
+        amount = Decimal("59.61") + i
+        entries.append(Transaction(
+            Narration(Payee(f"Payee{i % 50}"), "desc", "*", date(2021, 1, 1 + i % 28)),
+            [
+                Posting("Assets:BofA", amount, "USD"),
+                Posting("Expenses:Phone", -amount, "USD"),
+            ],
+        ))
+        entries.append(Balance("Assets:BofA", amount, "USD", date(2021, 2, 1)))
+    return entries
+
+
+def bench(name, dumps, loads, entries, number=5):
+    data = dumps(entries)
+    assert loads(data) == entries
+    dump_time = timeit.timeit(lambda: dumps(entries), number=number) / number
+    load_time = timeit.timeit(lambda: loads(data), number=number) / number
+    size = sum(map(len, data)) if isinstance(data, list) else len(data)
+    print(f"{name:<17} dump {dump_time * 1000:8.1f} ms  load {load_time * 1000:8.1f} ms  size {size:>8}")
+
+
+def each(func):
+    "Apply codec on every single entry, like passing entries one by one between processes"
+    def wrapper(items):
+        return [func(item) for item in items]
+    return wrapper
+
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    entries = make_entries(count)
+    print(f"{len(entries)} entries")
+    bench("pickle (batch)", pickle.dumps, pickle.loads, entries)
+    bench("columnar (batch)", serialize.dumps, serialize.loads, entries)
+    bench("pickle (each)", each(pickle.dumps), each(pickle.loads), entries)
+    bench("jsonl (each)", each(serialize.encode), each(serialize.decode), entries)
@@ -0,0 +1,102 @@
+"""Running balance index to fill and verify `balance` / `pad` entries.
+
+Parsing only reads the index. Entries are added to it explicitly with `add`,
+once the caller accepts them (e.g. after dedupe).
+"""
+from bisect import bisect_left
+from decimal import Decimal
+from .definitions import Balance, Pad, Transaction, date_ordinal as _ordinal
+
+
+class BalanceIndex:
+    def __init__(self):
+        # (account, currency) -> ([date ordinals], [balance at the end of the day])
+        self.series = {}
+        # account -> the latest unresolved pad entry
+        self.pads = {}
+        # (balance entry, expected amount) of failed assertions
+        self.mismatches = []
+
+    def add_posting(self, account, amount, currency, date_):
+        dates, totals = self.series.setdefault((account, currency), ([], []))
+        day = _ordinal(date_)
+        if not dates or day > dates[-1]:
+            dates.append(day)
+            totals.append((totals[-1] if totals else Decimal(0)) + amount)
+            return
+        if day == dates[-1]:
+            totals[-1] += amount
+            return
+
+        # Insert into the past, and shift the following totals
+        pos = bisect_left(dates, day)
+        if dates[pos] != day:
+            dates.insert(pos, day)
+            totals.insert(pos, totals[pos - 1] if pos else Decimal(0))
+        for i in range(pos, len(totals)):
+            totals[i] += amount
+
+    def add_transaction(self, trx):
+        for posting in trx.postings:
+            self.add_posting(posting.account, posting.amount, posting.currency, trx.get_date())
+
+    def add_pad(self, pad):
+        self.pads[pad.account] = pad
+
+    def balance(self, account, currency, date_):
+        "Balance at the beginning of the day, like balance assertions in beancount"
+        series = self.series.get((account, currency))
+        if series is None:
+            return Decimal(0)
+        dates, totals = series
+        pos = bisect_left(dates, _ordinal(date_))
+        return totals[pos - 1] if pos else Decimal(0)
+
+    def check(self, entry):
+        """Fill the amount of a balance entry, or verify it.
+        A mismatch is resolved by a pending pad on the account, or recorded in `mismatches`.
+        Return whether the assertion holds.
+        """
+        expected = self.balance(entry.account, entry.currency, entry.date_)
+        if entry.amount is None:
+            entry.amount = expected
+            return True
+        if entry.amount == expected:
+            return True
+
+        pad = self.pads.get(entry.account)
+        if pad is not None and _ordinal(pad.date_) < _ordinal(entry.date_):
+            del self.pads[entry.account]
+            diff = entry.amount - expected
+            self.add_posting(pad.account, diff, entry.currency, pad.date_)
+            self.add_posting(pad.to_account, -diff, entry.currency, pad.date_)
+            return True
+        self.mismatches.append((entry, expected))
+        return False
+
+    def add(self, entry):
+        "Add an accepted entry, transactions and pads are recorded and balances are verified"
+        if isinstance(entry, Transaction):
+            self.add_transaction(entry)
+        elif isinstance(entry, Pad):
+            self.add_pad(entry)
+        elif isinstance(entry, Balance):
+            self.check(entry)
+
+    def load(self, entries):
+        "Load entries from an existing ledger"
+        transactions, directives = [], []
+        for entry in entries:
+            if isinstance(entry, Transaction):
+                transactions.append(entry)
+            elif isinstance(entry, (Balance, Pad)):
+                directives.append(entry)
+
+        # Transactions are added in date order, so none is inserted into the past
+        transactions.sort(key=lambda entry: _ordinal(entry.get_date()))
+        for entry in transactions:
+            self.add_transaction(entry)
+        # Assertions are checked in date order, after all transactions are known
+        directives.sort(key=lambda entry: _ordinal(entry.get_date()))
+        for entry in directives:
+            self.add(entry)
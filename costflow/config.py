@@ -1,16 +1,139 @@
-from dataclasses import dataclass, field
+import json
+import os
+import threading
+from dataclasses import dataclass, field, replace
+from . import utils
 
 
 @dataclass
 class Config:
     default_currency: str = "CNY"
     formulas: dict = field(default_factory=dict)
+    csv_mappings: dict = field(default_factory=dict)
+    # Ledger context
+    balances: object = None     # BalanceIndex
+    predictor: object = None    # PostingPredictor
+    accounts: object = None     # set of known accounts, see `accept`
+    # Input limits of `Costflow.parse`, 0 for unlimited
+    max_input_length: int = 0
+    max_tokens: int = 0
+    time_budget: float = 0      # seconds
 
     def get_formula(self, name):
         return self.formulas.get(name, "")
 
+    def get_csv_mapping(self, name):
+        return self.csv_mappings[name]
+
+    def accept(self, entry):
+        "Record the account opened or closed by an accepted entry, building an entry never does"
+        if self.accounts is None:
+            return
+        directive = getattr(entry, "directive", None)
+        if directive == "open":
+            self.accounts.add(entry.content)
+        elif directive == "close":
+            self.accounts.discard(entry.content)
+
     # TODO: Beancount loader for default currency
 
+    @classmethod
+    def load(cls, path):
+        "Load config from a JSON, TOML or YAML file"
+        ext = os.path.splitext(path)[1].lower()
+        with open(path, "rb") as f:
+            if ext == ".toml":
+                try:
+                    import tomllib
+                except ImportError:
+                    try:
+                        import tomli as tomllib
+                    except ImportError:
+                        raise ImportError("tomli is required to load TOML config before Python 3.11")
+                data = tomllib.load(f)
+            elif ext in (".yaml", ".yml"):
+                try:
+                    import yaml
+                except ImportError:
+                    raise ImportError("PyYAML is required to load YAML config")
+                data = yaml.safe_load(f) or {}
+            else:
+                data = json.load(f)
+        # Files have lists, while accounts are looked up as a set
+        if data.get("accounts") is not None:
+            data["accounts"] = set(data["accounts"])
+        return cls(**data)
+
+
+class ConfigWatcher:
+    """Reload the global config once its file changes, checked by polling `os.stat`.
+
+    Only changed formulas are compiled, before the new config is swapped in,
+    so parses in flight keep using the old one.
+    """
+    def __init__(self, path, interval=1.0):
+        self.path = path
+        self.interval = interval
+        self.error = None
+        self._signature = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _stat(self):
+        stat = os.stat(self.path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def check(self):
+        "Reload if the file changed, return the names of changed formulas"
+        try:
+            signature = self._stat()
+            if signature == self._signature:
+                return set()
+            new = Config.load(self.path)
+        except Exception as e:
+            # Keep the running config on a broken file
+            self.error = e
+            return set()
+        self._signature = signature
+        self.error = None
+        return self.apply(new)
+
+    def apply(self, new):
+        global config
+        old = config
+        changed = {
+            name for name in old.formulas.keys() | new.formulas.keys()
+            if old.formulas.get(name) != new.formulas.get(name)
+        }
+        for name in changed:
+            if name in new.formulas:
+                utils.compile_formula(new.formulas[name])
+        # Runtime context is kept, and the reference is swapped at once
+        config = replace(
+            old,
+            default_currency=new.default_currency,
+            formulas=new.formulas,
+            csv_mappings=new.csv_mappings,
+            max_input_length=new.max_input_length,
+            max_tokens=new.max_tokens,
+            time_budget=new.time_budget,
+        )
+        return changed
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.check()
+            self._stop.wait(self.interval)
+
 
 # Global store
 config = Config()
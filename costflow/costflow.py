@@ -1,59 +1,201 @@
+import re
+import time
+from bisect import bisect_right
+from collections import Counter
 from ply import lex, yacc
-from . import rules, utils, definitions, config
-from jinja2 import Template
+from . import rules, journal, utils, definitions, config
 
 
 class Costflow:
-    def __init__(self, conf=None):
+    def __init__(self, conf=None, intern_strings=False, global_config=True):
+        # `conf` replaces the global config, or with `global_config=False` it is only used by this parser
+        self.conf = None
         if conf is not None:
-            config.config = conf
+            if global_config:
+                config.config = conf
+            else:
+                self.conf = conf
 
         self.parser = yacc.yacc(module=rules)
         self.lexer = lex.lex(module=rules)
+        # Date abbreviations are anchored at line start, which needs multiline mode in a journal
+        self.journal_parser = yacc.yacc(module=journal, tabmodule="journaltab", debug=False)
+        self.journal_lexer = lex.lex(module=journal, reflags=re.VERBOSE | re.MULTILINE)
+
+        # Opt-in interning table of accounts, currencies and payees, shared by the lexer clones.
+        # It is bounded, and can be cleared between batches.
+        self.strings = {} if intern_strings else None
+        self.lexer.strings = self.journal_lexer.strings = self.strings
+        # Rejected inputs by the reason of limit
+        self.rejected = Counter()
+        # ShadowRunner comparing a candidate engine on sampled inputs
+        self.shadow = None
+
+    def get_config(self):
+        return self.conf if self.conf is not None else config.config
 
     def compile_template(self, formula, inputs):
-        variables = utils.fetch_variables(formula)
+        template, variables = utils.compile_formula(formula)
         amount, pre = "", ""
         if "amount" in variables:
             amount = inputs[0]
             inputs = inputs[1:]
         if "pre" in variables:
             pre = " ".join(inputs)
-        return Template(formula).render(pre=pre, amount=amount)
+        return template.render(pre=pre, amount=amount)
 
-    def _process_template(self, segments):
+    def _process_template(self, segments, conf, deadline=None):
         formula_name, *variables = segments
-        formula = config.config.get_formula(formula_name)
+        formula = conf.get_formula(formula_name)
+        _check_deadline(deadline)
         output = self.compile_template(formula, variables)
         if output:
-            return self.parse_raw(output)
+            _check_length(output, conf)
+            return self.parse_raw(output, deadline, conf)
+
+    def _tokens(self, lexer, conf, deadline):
+        "Token function of the parser, which enforces token count and time limits"
+        max_tokens = conf.max_tokens
+        count = 0
+
+        def token():
+            nonlocal count
+            _check_deadline(deadline)
+            tok = lexer.token()
+            # The end of input is not counted
+            if tok is not None:
+                count += 1
+                if max_tokens and count > max_tokens:
+                    raise definitions.CostflowLimitError("tokens", f"Input has more than {max_tokens} tokens")
+            return tok
+        return token
 
-    def parse_raw(self, inputs):
+    def parse_raw(self, inputs, deadline=None, conf=None):
+        if conf is None:
+            conf = self.get_config()
+        lexer = self.lexer.clone()
+        # Entries are built with the config the parse started with
+        lexer.conf = conf
+        lexer.input(inputs)
         try:
-            return self.parser.parse(inputs, lexer=self.lexer.clone())
+            return self.parser.parse(lexer=lexer, tokenfunc=self._tokens(lexer, conf, deadline))
         except definitions.CostflowSyntaxError:
             pass
         finally:
             self.parser.restart()
 
     def parse(self, inputs):
+        """Parse a single entry.
+        Raise `CostflowLimitError` if the input exceeds a limit in config, which is counted in `rejected`.
+        The config is read once, so a reload in the middle of a parse takes effect on the next one.
+        """
+        conf = self.get_config()
+        shadow = self.shadow is not None and self.shadow.sample()
+        start = time.perf_counter()
+        try:
+            _check_length(inputs, conf)
+            budget = conf.time_budget
+            result = self._parse(inputs, conf, time.monotonic() + budget if budget else None)
+        except definitions.CostflowLimitError as e:
+            self.rejected[e.reason] += 1
+            raise
+        if shadow:
+            self.shadow.observe(inputs, result, time.perf_counter() - start)
+        return result
+
+    def parse_formula(self, name, inputs):
+        """Parse the entry rendered by formula `name` with a list of inputs, None if it is not an entry.
+        Limits are enforced like in `parse`.
+        """
+        conf = self.get_config()
+        segments = [name, *inputs]
+        try:
+            _check_length(" ".join(segments), conf)
+            budget = conf.time_budget
+            return self._process_template(segments, conf, time.monotonic() + budget if budget else None)
+        except definitions.CostflowLimitError as e:
+            self.rejected[e.reason] += 1
+            raise
+
+    def _parse(self, inputs, conf, deadline):
         result = None
         # Try to render template
         segments = inputs.split()
         if segments[0] == "f" and len(segments) > 1:
-            result = self._process_template(segments[1:])
+            result = self._process_template(segments[1:], conf, deadline)
             if result is not None:
                 return result
 
         # Parse original string
-        result = self.parse_raw(inputs)
+        result = self.parse_raw(inputs, deadline, conf)
         if result is not None:
             return result
 
         # Fallback to formula
-        result = self._process_template(segments)
+        result = self._process_template(segments, conf, deadline)
         if result is not None:
             return result
 
         # Fallback to comment
         return definitions.Comment(inputs)
+
+    def parse_journal(self, text):
+        """Parse a multi-line message or file in one pass.
+        Return entries in line order, and the errors of lines which fell back to
+        formula or comment like `parse` does.
+        """
+        raw_lines = text.split("\n")
+        # Formula directives are rendered line by line, so blank them out in the journal
+        formula_lines = [i for i, line in enumerate(raw_lines, 1) if line.split(maxsplit=1)[:1] == ["f"]]
+        lines = list(raw_lines)
+        for lineno in formula_lines:
+            lines[lineno - 1] = ""
+
+        source = list(lines)
+        given_up = []
+        while True:
+            lexer = self.journal_lexer.clone()
+            lexer.conf = self.get_config()
+            lexer.lineno = 1
+            lexer.line_starts = [1]
+            lexer.errors = []
+            # The trailing line break lets errors on last line recover as well
+            results = self.journal_parser.parse("\n".join(lines) + "\n", lexer=lexer)
+            starts = lexer.line_starts
+            filled = [i for i, line in enumerate(lines, 1) if line.strip()]
+            if results is not None or not filled:
+                break
+            # Not recovered at the end of input, give up the last line and parse the others again
+            lineno = starts[bisect_right(starts, filled[-1]) - 1]
+            given_up.append(journal.LineError(lineno, "Unexpected end of input"))
+            lines[lineno - 1:] = [""] * (len(lines) - lineno + 1)
+
+        entries, errors = {}, lexer.errors + given_up
+        for lineno, entry in zip(starts, results or []):
+            if isinstance(entry, journal.BuildError):
+                errors.append(journal.LineError(lineno, entry.message))
+            elif entry is not None:
+                entries[lineno] = entry
+        errors.sort(key=lambda err: err.lineno)
+        for err in errors:
+            # A line with its pipe postings, without the blank lines after
+            index = bisect_right(starts, err.lineno)
+            end = starts[index] - 1 if index < len(starts) else len(source)
+            line = source[err.lineno - 1:end]
+            while len(line) > 1 and not line[-1].strip():
+                line.pop()
+            entries[err.lineno] = self.parse("\n".join(line))
+        for lineno in formula_lines:
+            entries[lineno] = self.parse(raw_lines[lineno - 1])
+        return [entries[lineno] for lineno in sorted(entries)], errors
+
+
+def _check_length(inputs, conf):
+    limit = conf.max_input_length
+    if limit and len(inputs) > limit:
+        raise definitions.CostflowLimitError("length", f"Input is longer than {limit} characters")
+
+
+def _check_deadline(deadline):
+    if deadline is not None and time.monotonic() > deadline:
+        raise definitions.CostflowLimitError("time", "Input exceeds the time budget")
@@ -0,0 +1,112 @@
+"""Streaming import of CSV bank statements.
+
+A mapping in `Config.csv_mappings` describes how columns become entries.
+Transactions are built directly from columns with:
+
+    {
+        "date": "Date", "date_format": "%m/%d/%Y",
+        "payee": "Description", "narration": "Memo",
+        "amount": "Amount", "currency": "Currency",
+        "account": "Assets:BofA", "counter_account": "Expenses:Unknown",
+    }
+
+Or the columns are used as inputs of a formula, like `f bofa <Amount> <Description>`:
+
+    {"formula": "bofa", "inputs": ["Amount", "Description"]}
+"""
+import csv
+from datetime import datetime
+from decimal import Decimal
+from itertools import islice
+from dateutil import parser as dateparse
+from . import config
+from .definitions import Comment, Narration, Payee, Posting, Transaction
+
+
+def read_chunks(fp, delimiter=",", chunk_size=1000):
+    "Read rows as dicts, `chunk_size` rows at a time"
+    reader = csv.DictReader(fp, delimiter=delimiter)
+    while True:
+        chunk = list(islice(reader, chunk_size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class _DateConverter:
+    "Statements repeat the same few dates, so every date string is parsed once"
+    def __init__(self, date_format=None):
+        self.date_format = date_format
+        self.cache = {}
+
+    def __call__(self, value):
+        date_ = self.cache.get(value)
+        if date_ is None:
+            if self.date_format:
+                date_ = datetime.strptime(value, self.date_format).date()
+            else:
+                date_ = dateparse.parse(value).date()
+            self.cache[value] = date_
+        return date_
+
+
+def _to_decimal(value):
+    return Decimal(value.replace(",", "").strip())
+
+
+def _build_transactions(chunk, mapping, convert_date):
+    dates = [convert_date(row[mapping["date"]]) for row in chunk]
+    amounts = [_to_decimal(row[mapping["amount"]]) for row in chunk]
+    payee, narration, currency = mapping.get("payee"), mapping.get("narration"), mapping.get("currency")
+    for row, date_, amount in zip(chunk, dates, amounts):
+        cur = row[currency] if currency else None
+        trx = Transaction(
+            narration=Narration(
+                Payee(row[payee] if payee else ""),
+                row[narration] if narration else "",
+                "*",
+                date_,
+            ),
+            postings=[
+                Posting(mapping["account"], amount, cur),
+                Posting(mapping["counter_account"], currency=cur),
+            ],
+        )
+        trx.build()
+        yield trx
+
+
+def _render_formulas(chunk, mapping, costflow):
+    formula, columns = mapping["formula"], mapping["inputs"]
+    for row in chunk:
+        inputs = [row[column].strip() for column in columns]
+        entry = costflow.parse_formula(formula, inputs)
+        yield entry if entry is not None else Comment(" ".join(inputs))
+
+
+def import_csv(fp, mapping, costflow=None, chunk_size=1000):
+    """Yield entries from a CSV file object, `mapping` is a mapping or its name in config.
+    Formula mappings are rendered with `costflow`, which enforces the limits of config.
+    """
+    if isinstance(mapping, str):
+        mapping = config.config.get_csv_mapping(mapping)
+    if "formula" in mapping and costflow is None:
+        raise ValueError("A Costflow is required to import with a formula")
+    delimiter = mapping.get("delimiter", ",")
+    convert_date = _DateConverter(mapping.get("date_format"))
+
+    for chunk in read_chunks(fp, delimiter, chunk_size):
+        if "formula" in mapping:
+            yield from _render_formulas(chunk, mapping, costflow)
+        else:
+            yield from _build_transactions(chunk, mapping, convert_date)
+
+
+def render_csv(fp, mapping, out, costflow=None, chunk_size=1000):
+    "Stream beancount text into `out`, return the number of entries"
+    count = 0
+    for entry in import_csv(fp, mapping, costflow, chunk_size):
+        out.write(entry.render())
+        out.write("\n\n")
+        count += 1
+    return count
@@ -0,0 +1,60 @@
+"""Duplicate transaction detection for imports.
+
+Transactions are compared after `Transaction.build`, so that postings with
+filled amounts and currencies are compared.
+"""
+from .definitions import Transaction, date_ordinal
+
+
+def postings_key(trx):
+    return tuple(sorted((p.account, p.amount, p.currency) for p in trx.postings))
+
+
+def _ordinal(trx):
+    return date_ordinal(trx.get_date())
+
+
+def fingerprint(trx):
+    narration = trx.narration
+    return (_ordinal(trx), str(narration.payee), narration.desc, postings_key(trx))
+
+
+class Deduper:
+    """Hash index of seen transactions.
+
+    A transaction is a duplicate if its fingerprint was seen before, or if a
+    transaction with the same postings was seen within `window` days.
+    """
+    def __init__(self, window=0):
+        self.window = window
+        self.fingerprints = set()
+        # postings key -> set of date ordinals
+        self.postings = {}
+
+    def add(self, trx):
+        self.fingerprints.add(fingerprint(trx))
+        self.postings.setdefault(postings_key(trx), set()).add(_ordinal(trx))
+
+    def load(self, entries):
+        "Preload transactions from an existing ledger"
+        for entry in entries:
+            if isinstance(entry, Transaction):
+                self.add(entry)
+
+    def is_duplicate(self, trx):
+        if fingerprint(trx) in self.fingerprints:
+            return True
+        if self.window:
+            dates = self.postings.get(postings_key(trx), ())
+            day = _ordinal(trx)
+            return any(d in dates for d in range(day - self.window, day + self.window + 1))
+        return False
+
+    def filter(self, entries):
+        "Yield entries except duplicated transactions, yielded ones are indexed"
+        for entry in entries:
+            if isinstance(entry, Transaction):
+                if self.is_duplicate(entry):
+                    continue
+                self.add(entry)
+            yield entry
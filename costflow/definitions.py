@@ -1,16 +1,26 @@
 from datetime import date, datetime
-from dataclasses import dataclass, field
+from dataclasses import dataclass, field, fields, is_dataclass
 from decimal import Decimal
 from collections import defaultdict
+from functools import lru_cache, partial
+from operator import attrgetter
 from abc import ABCMeta, abstractmethod
+from typing import List
 from .utils import check_account
-from .config import config
+from . import config
 
 
 class CostflowSyntaxError(Exception):
     pass
 
 
+class CostflowLimitError(Exception):
+    "Input is rejected by a limit in config, it never falls back to comment"
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
+
+
 class Entry(metaclass=ABCMeta):
     @abstractmethod
     def render(self):
@@ -20,6 +30,30 @@ class Entry(metaclass=ABCMeta):
         if self.date_ is None:
             self.date_ = datetime.today().date()
 
+    def get_date(self):
+        "Date of the entry, None if it is undated or not filled yet"
+        return getattr(self, "date_", None)
+
+    def to_dict(self, compact=False):
+        """Convert entry to JSON-compatible values.
+        Decimals are kept as strings and dates as ordinals, so the conversion is lossless.
+        With `compact`, fields are dumped positionally into lists instead of dicts.
+        """
+        data = _dump_fields(self, compact)
+        if compact:
+            return [type(self).__name__] + data
+        data["type"] = type(self).__name__
+        return data
+
+    @classmethod
+    def from_dict(cls, data):
+        "Load entry from the output of `to_dict`"
+        if isinstance(data, list):
+            type_, *data = data
+        else:
+            type_ = data.get("type", cls.__name__)
+        return _load_fields(ENTRY_TYPES[type_], data)
+
 
 @dataclass
 class Payee:
@@ -40,6 +74,11 @@ class Narration:
 DEFAULT_CURRENCY = "CNY"
 
 
+def date_ordinal(date_):
+    "Ordinal of an entry date, undated entries are dated today as they are rendered"
+    return (date_ or datetime.today().date()).toordinal()
+
+
 @dataclass
 class Posting:
     account: str
@@ -50,13 +89,29 @@ class Posting:
 @dataclass
 class Transaction(Entry):
     narration: Narration
-    postings: list = field(default_factory=list)
+    postings: List[Posting] = field(default_factory=list)
 
     def push(self, posting):
         self.postings.append(posting)
 
-    def build(self):
-        "Fill empty currency and amount"
+    def get_date(self):
+        return self.narration.date_
+
+    def build(self, conf=None):
+        "Fill empty account, currency and amount"
+        conf = conf or config.config
+        predictor = conf.predictor
+        missing = any(posting.account is None for posting in self.postings)
+        if predictor is not None and (missing or len(self.postings) < 2):
+            missing = not predictor.complete(self)
+        if missing:
+            raise CostflowSyntaxError("Posting account is required")
+        known = conf.accounts
+        for posting in self.postings:
+            # Short aliases (e.g. "bofa") are left to account finding
+            if ":" in posting.account and not check_account(posting.account, known):
+                raise CostflowSyntaxError(f"Invalid account: {posting.account}")
+
         currency = None
         empty = []
         for posting in self.postings:
@@ -65,7 +120,7 @@ class Transaction(Entry):
             elif currency is None:
                 currency = posting.currency
         if currency is None:
-            currency = config.default_currency
+            currency = conf.default_currency
         for posting in empty:
             posting.currency = currency
 
@@ -100,7 +155,7 @@ class Transaction(Entry):
 class Comment(Entry):
     content: str
 
-    def build(self):
+    def build(self, conf=None):
         pass
 
     def render(self):
@@ -113,9 +168,12 @@ class UnaryEntry(Entry):
     content: str
     date_: date = None
 
-    def build(self):
+    def build(self, conf=None):
         if self.directive in ("open", "close"):
-            check_account(self.content)
+            known = (conf or config.config).accounts
+            # An account is unknown until it is opened
+            if not check_account(self.content, known if self.directive == "close" else None):
+                raise CostflowSyntaxError(f"Invalid account: {self.content}")
 
     def render(self):
         self.fill_date()
@@ -138,7 +196,7 @@ class KVEntry(Entry):
     value: str
     date_: date = None
 
-    def build(self):
+    def build(self, conf=None):
         # TODO: account finding on note directive
         pass
 
@@ -155,13 +213,17 @@ class KVEntry(Entry):
 @dataclass
 class Balance(Entry):
     account: str
-    amount: Decimal
+    amount: Decimal = None
     currency: str = DEFAULT_CURRENCY
     date_: date = None
 
-    def build(self):
+    def build(self, conf=None):
         # TODO: account finding on account directive
-        pass
+        if self.amount is None:
+            balances = (conf or config.config).balances
+            if balances is None:
+                raise CostflowSyntaxError("Balance amount is required without ledger context")
+            self.amount = balances.balance(self.account, self.currency, self.date_)
 
     def render(self):
         self.fill_date()
@@ -174,10 +236,100 @@ class Pad(Entry):
     to_account: str
     date_: date = None
 
-    def build(self):
+    def build(self, conf=None):
         # TODO: account finding
         pass
 
     def render(self):
         self.fill_date()
         return f'{self.date_} pad {self.account} {self.to_account}'
+
+
+@dataclass
+class Price(Entry):
+    commodity: str
+    amount: Decimal
+    currency: str = DEFAULT_CURRENCY
+    date_: date = None
+
+    def render(self):
+        self.fill_date()
+        return f'{self.date_} price {self.commodity} {self.amount} {self.currency}'
+
+
+ENTRY_TYPES = {
+    cls.__name__: cls
+    for cls in (Transaction, Comment, UnaryEntry, Option, KVEntry, Balance, Pad, Price)
+}
+
+
+# --- Serialization helpers ---
+def _dump_value(value, compact):
+    if isinstance(value, str) or value is None:
+        return value
+    if isinstance(value, Decimal):
+        return str(value)
+    if isinstance(value, date):
+        return value.toordinal()
+    if isinstance(value, Payee):
+        return value.payee
+    if isinstance(value, list):
+        return [_dump_value(v, compact) for v in value]
+    if is_dataclass(value):
+        return _dump_fields(value, compact)
+    return value
+
+
+def _dump_fields(obj, compact):
+    names, getter = _field_getter(type(obj))
+    values = [_dump_value(v, compact) for v in getter(obj)]
+    if compact:
+        return values
+    return dict(zip(names, values))
+
+
+@lru_cache(maxsize=None)
+def _field_getter(cls):
+    names = tuple(f.name for f in fields(cls))
+    getter = attrgetter(*names)
+    if len(names) == 1:
+        return names, lambda obj: (getter(obj), )
+    return names, getter
+
+
+@lru_cache(maxsize=None)
+def _field_loaders(cls):
+    return tuple((f.name, _loader(f.type)) for f in fields(cls))
+
+
+def _loader(type_):
+    "Build the function which restores a dumped value of `type_`, None for plain values"
+    if type_ in (Decimal, Payee):
+        return type_
+    if type_ is date:
+        return date.fromordinal
+    if is_dataclass(type_):
+        return partial(_load_fields, type_)
+    if getattr(type_, "__origin__", None) is list:
+        load_item = _loader(type_.__args__[0])
+        return partial(_load_list, load_item)
+    return None
+
+
+def _load_list(load_item, values):
+    return [load_item(v) for v in values]
+
+
+def _load_fields(cls, data):
+    loaders = _field_loaders(cls)
+    if isinstance(data, list):
+        return cls(*[
+            v if load is None or v is None else load(v)
+            for (_, load), v in zip(loaders, data)
+        ])
+    return cls(**{
+        name: (v if load is None or v is None else load(v))
+        for name, load in loaders
+        if name in data
+        for v in (data[name], )
+    })
@@ -0,0 +1,57 @@
+"""Export entries sorted by date with bounded memory.
+
+Entries are rendered as they come, buffered until `memory_budget` bytes,
+and sorted runs are spilled to temporary files. The runs are then k-way
+merged into the output, so only the rendered text of a single run is kept
+in memory, never the entries themselves.
+"""
+import heapq
+import json
+import sys
+import tempfile
+
+
+def _key(entry):
+    # Undated entries (options, comments) go first
+    date_ = entry.get_date()
+    return date_.toordinal() if date_ else 0
+
+
+def _spill(run, tmpdir):
+    run.sort()
+    f = tempfile.TemporaryFile("w+", encoding="utf-8", dir=tmpdir)
+    for key, seq, text in run:
+        f.write(f"{key}\t{seq}\t{json.dumps(text, ensure_ascii=False)}\n")
+    f.seek(0)
+    return f
+
+
+def _read_run(f):
+    for line in f:
+        key, seq, text = line.split("\t", 2)
+        yield int(key), int(seq), json.loads(text)
+
+
+def export_sorted(entries, out, memory_budget=64 * 1024 * 1024, tmpdir=None):
+    """Write rendered entries into `out` sorted by date, entries of the same date keep their order.
+    Return the number of spilled runs.
+    """
+    runs, buffer, size = [], [], 0
+    try:
+        for seq, entry in enumerate(entries):
+            # Render first, it fills the date of undated entries
+            text = entry.render()
+            buffer.append((_key(entry), seq, text))
+            size += sys.getsizeof(text) + 64
+            if size >= memory_budget:
+                runs.append(_spill(buffer, tmpdir))
+                buffer, size = [], 0
+
+        buffer.sort()
+        for _, _, text in heapq.merge(buffer, *(_read_run(f) for f in runs)):
+            out.write(text)
+            out.write("\n\n")
+    finally:
+        for f in runs:
+            f.close()
+    return len(runs)
@@ -0,0 +1,123 @@
+"""Grammar for parsing a whole message or file in one pass.
+
+It extends the rules of a single entry with `journal : entry*`, entries are
+separated by line breaks (except the lines starting with a pipe, which
+continue the transaction above). A bad line is recovered at the next line
+break, and reported with its line number.
+"""
+from bisect import bisect_right
+from dataclasses import dataclass
+from .rules import *  # noqa: F401,F403
+from . import rules
+from .definitions import CostflowSyntaxError
+
+
+@dataclass
+class LineError:
+    lineno: int
+    message: str
+
+
+@dataclass
+class BuildError:
+    "Placeholder of an entry which failed to build, the line is reported by `Costflow.parse_journal`"
+    message: str
+
+
+tokens = rules.tokens + ["NEWLINE"]
+start = "journal"
+
+
+def t_newline(t):
+    r'\n+'
+    lexer = t.lexer
+    lexer.lineno += t.value.count("\n")
+
+    # Pipe postings on the next line belong to the current transaction
+    pos = lexer.lexpos
+    data = lexer.lexdata
+    while pos < len(data) and data[pos] in " \t":
+        pos += 1
+    if pos < len(data) and data[pos] == "|":
+        return None
+
+    # Every line starts over from the initial state
+    del lexer.lexstatestack[:]
+    lexer.begin("INITIAL")
+    lexer.line_starts.append(lexer.lineno)
+    t.type = "NEWLINE"
+    return t
+
+
+t_ANY_newline = t_newline
+
+
+def t_COMMENT(t):
+    r'(;|//)([ \t]+|(?=\n))'
+    # Unlike a single entry, the line break after a comment mark ends the line
+    t.lexer.begin("comment")
+    return t
+
+
+def t_STRING_LETERAL(t):
+    r'\"([^\\\"\n]|\\[^\n])*\"'
+    # A quoted string does not span lines, so line numbers stay in step
+    return rules.t_STRING_LETERAL(t)
+
+
+t_anyvalue_LETERAL = t_STRING_LETERAL
+
+
+# Build errors are kept within their lines, instead of aborting the journal
+def _build(t, entry):
+    try:
+        entry.build(t.lexer.conf)
+    except CostflowSyntaxError as e:
+        return BuildError(str(e))
+    return entry
+
+
+def p_entry_transaction(t):
+    "entry : transaction"
+    t[0] = _build(t, t[1])
+
+
+def p_entry_open_close(t):
+    """entry : comment
+             | open
+             | close
+             | note
+             | balance
+             | pad"""
+    t[0] = _build(t, t[1])
+
+
+def p_journal(t):
+    """journal : line
+               | journal NEWLINE line"""
+    # One item per line, line numbers are looked up from `lexer.line_starts`
+    if len(t) == 2:
+        t[0] = [t[1]]
+    else:
+        t[1].append(t[3])
+        t[0] = t[1]
+    # Report the error on next line, even if it comes right after this one
+    t.parser.errok()
+
+
+def p_line(t):
+    """line : entry
+            | error
+            | """
+    t[0] = t[1] if len(t) == 2 and t.slice[1].type == "entry" else None
+
+
+def p_error(t):
+    if t is None:
+        # The parse is given up, `Costflow.parse_journal` reports the last line
+        return
+    lexer = t.lexer
+    starts = lexer.line_starts
+    lineno = starts[bisect_right(starts, t.lineno) - 1]
+    if not lexer.errors or lexer.errors[-1].lineno != lineno:
+        lexer.errors.append(LineError(lineno, "Syntax error at '{}'".format(t.value)))
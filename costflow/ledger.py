@@ -0,0 +1,258 @@
+"""Date-ordered insertion into an existing (date-sorted) ledger file.
+
+`LedgerIndex` maps the date of every entry in the file to the byte offset of
+its first line. New entries are inserted before the first entry dated after
+them, and a batch of insertions rewrites the file from the first insertion
+point only, so its cost scales with the inserted entries and the tail after
+them rather than the file size.
+
+The new tail is saved in a redo journal `<path>.redo` before the file is
+spliced in place, a splice cut short by a crash is completed from the
+journal when the ledger is opened or written next.
+"""
+import json
+import os
+import re
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date
+from .definitions import date_ordinal
+from .writer import FileLock
+
+_DATED_LINE = re.compile(rb"^(\d{4})-(\d{2})-(\d{2})\s", re.MULTILINE)
+# Bytes at the end of the indexed file which must be unchanged, to index appended bytes only
+_CHECK_SIZE = 4096
+
+
+def _ordinal(entry):
+    return date_ordinal(entry.get_date())
+
+
+def _fsync_dir(path):
+    "Make a created or removed file in the directory of `path` durable"
+    try:
+        fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:     # Windows
+        return
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_at(path, start, data):
+    "Replace the file from `start` with `data`"
+    with open(path, "r+b") as f:
+        f.seek(start)
+        f.write(data)
+        f.truncate()
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def replay(path):
+    """Complete a splice of `path` cut short by a crash, return whether there was one.
+    It must be called with the file lock held.
+    """
+    redo = f"{path}.redo"
+    try:
+        with open(redo, "rb") as f:
+            header = json.loads(f.readline())
+            data = f.read()
+    except FileNotFoundError:
+        return False
+    except ValueError:
+        header, data = None, b""
+    # A journal which is not complete was cut short before the ledger was touched
+    if header and len(data) == header["length"] and zlib.crc32(data) == header["crc"]:
+        _write_at(path, header["start"], data)
+    os.unlink(redo)
+    _fsync_dir(redo)
+    return True
+
+
+class LedgerIndex:
+    def __init__(self, path, index_path=None):
+        self.path = path
+        self.index_path = index_path
+        self.dates = array("l")
+        self.offsets = array("Q")
+        self.size = 0
+        # (size, mtime) of the file when it was indexed, and the CRC of its last bytes
+        self.signature = None
+        self.check = None
+        with FileLock(path):
+            replay(path)
+            if not (index_path and self._load()):
+                self.build()
+
+    def _signature(self):
+        stat = os.stat(self.path)
+        return stat.st_size, stat.st_mtime_ns
+
+    def build(self):
+        "Scan the whole ledger"
+        self.dates = array("l")
+        self.offsets = array("Q")
+        with open(self.path, "rb") as f:
+            data = f.read()
+        for match in _DATED_LINE.finditer(data):
+            year, month, day = map(int, match.groups())
+            self.dates.append(date(year, month, day).toordinal())
+            self.offsets.append(match.start())
+        self.size = len(data)
+        self.signature = self._signature()
+        self.check = zlib.crc32(data[-_CHECK_SIZE:])
+        self.save()
+
+    def save(self):
+        if not self.index_path:
+            return
+        size, mtime = self.signature
+        header = {"size": size, "mtime_ns": mtime, "check": self.check, "count": len(self.dates)}
+        with open(self.index_path, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            self.dates.tofile(f)
+            self.offsets.tofile(f)
+
+    def _load(self):
+        "Load the saved index, return False if it is missing or stale"
+        try:
+            with open(self.index_path, "rb") as f:
+                header = json.loads(f.readline())
+                if (header["size"], header["mtime_ns"]) != self._signature():
+                    return False
+                self.dates.fromfile(f, header["count"])
+                self.offsets.fromfile(f, header["count"])
+        except (OSError, ValueError, EOFError):
+            self.dates, self.offsets = array("l"), array("Q")
+            return False
+        self.size = header["size"]
+        self.signature = (header["size"], header["mtime_ns"])
+        self.check = header.get("check")
+        return True
+
+    def offset_for(self, ordinal):
+        "Byte offset to insert an entry of the date, after the entries on the same day"
+        pos = bisect_right(self.dates, ordinal)
+        return self.offsets[pos] if pos < len(self.offsets) else self.size
+
+    def insert(self, entries):
+        "Insert entries by date, the file is rewritten from the first insertion point"
+        entries = list(entries)
+        if not entries:
+            return
+
+        with FileLock(self.path):
+            replay(self.path)
+            self.refresh()
+            items = sorted(
+                (self.offset_for(_ordinal(entry)), _ordinal(entry), seq, entry) for seq, entry in enumerate(entries)
+            )
+            start = items[0][0]
+            with open(self.path, "rb") as f:
+                # Keep a line break before the entries appended to the end
+                missing_newline = self._missing_newline(f)
+                f.seek(start)
+                tail = f.read()
+
+                # (offset in the old file, date or None if not indexed, offset in the new file, inserted length)
+                inserted = []
+                chunks = []
+                cursor = start
+                written = start
+                for offset, ordinal, _, entry in items:
+                    segment = tail[cursor - start:offset - start]
+                    if offset == self.size and missing_newline:
+                        segment += b"\n"
+                        missing_newline = False
+                    chunks.append(segment)
+                    written += len(segment)
+                    cursor = offset
+                    text = f"{entry.render()}\n\n".encode("utf-8")
+                    # Only dated lines are indexed, like `build` does
+                    indexed = ordinal if _DATED_LINE.match(text) else None
+                    inserted.append((offset, indexed, written, len(text)))
+                    chunks.append(text)
+                    written += len(text)
+                chunks.append(tail[cursor - start:])
+                data = b"".join(chunks)
+
+            self._splice(start, data)
+            self._update(start, inserted, start + len(data) - self.size)
+
+    def _splice(self, start, data):
+        "Replace the file from `start` with `data`, through the redo journal"
+        redo = f"{self.path}.redo"
+        header = {"start": start, "length": len(data), "crc": zlib.crc32(data)}
+        with open(redo, "wb") as f:
+            f.write(json.dumps(header).encode() + b"\n")
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        _fsync_dir(redo)
+        _write_at(self.path, start, data)
+        os.unlink(redo)
+        _fsync_dir(redo)
+
+    def refresh(self):
+        """Index the bytes appended by other writers since the file was indexed.
+        The whole file is scanned again if it is changed otherwise.
+        """
+        signature = self._signature()
+        if signature == self.signature:
+            return
+        size = signature[0]
+        if size < self.size:
+            return self.build()
+        # The last indexed bytes are read again, to tell an append from a rewrite
+        base = max(self.size - _CHECK_SIZE, 0)
+        with open(self.path, "rb") as f:
+            f.seek(base)
+            data = f.read(size - base)
+        known = self.size - base
+        if len(data) != size - base or zlib.crc32(data[:known]) != self.check:
+            return self.build()
+        # With a start position, `^` still only matches after a line break
+        for match in _DATED_LINE.finditer(data, known):
+            year, month, day = map(int, match.groups())
+            self.dates.append(date(year, month, day).toordinal())
+            self.offsets.append(base + match.start())
+        self.size = size
+        self.signature = signature
+        self.check = zlib.crc32(data[-_CHECK_SIZE:])
+        self.save()
+
+    def _missing_newline(self, f):
+        if not self.size:
+            return False
+        f.seek(self.size - 1)
+        return f.read(1) != b"\n"
+
+    def _update(self, start, inserted, growth):
+        "Shift offsets after the insertion point, and index the inserted entries"
+        pos = bisect_left(self.offsets, start)
+        dates, offsets = self.dates[:pos], self.offsets[:pos]
+        shift, i = 0, 0
+        for old_date, old_offset in zip(self.dates[pos:], self.offsets[pos:]):
+            while i < len(inserted) and inserted[i][0] <= old_offset:
+                _, ordinal, new_offset, length = inserted[i]
+                if ordinal is not None:
+                    dates.append(ordinal)
+                    offsets.append(new_offset)
+                shift += length
+                i += 1
+            dates.append(old_date)
+            offsets.append(old_offset + shift)
+        for _, ordinal, new_offset, _ in inserted[i:]:
+            if ordinal is not None:
+                dates.append(ordinal)
+                offsets.append(new_offset)
+        self.dates, self.offsets = dates, offsets
+        self.size += growth
+        self.signature = self._signature()
+        with open(self.path, "rb") as f:
+            f.seek(max(self.size - _CHECK_SIZE, 0))
+            self.check = zlib.crc32(f.read())
+        self.save()
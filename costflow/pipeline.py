@@ -0,0 +1,231 @@
+"""Staged concurrent ingestion pipeline.
+
+Every stage runs its function in its own worker threads (or in a process
+pool), and stages are connected with bounded queues, so a slow stage
+back-pressures the ones before it while they keep overlapping.
+A stage drops an item by returning None.
+"""
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from queue import Empty, Full, Queue
+from .costflow import Costflow
+
+_DONE = object()
+# Seconds between checks of the stop event, while blocked on a queue
+_POLL = 0.05
+
+
+def _put(queue, item, stop):
+    "Put unless the pipeline is stopped, return whether it is put"
+    while not stop.is_set():
+        try:
+            queue.put(item, timeout=_POLL)
+            return True
+        except Full:
+            pass
+    return False
+
+
+def _get(queue, stop):
+    "Get an item, or `_DONE` once the pipeline is stopped"
+    while not stop.is_set():
+        try:
+            return queue.get(timeout=_POLL)
+        except Empty:
+            pass
+    return _DONE
+
+
+@dataclass
+class StageStats:
+    processed: int = 0
+    dropped: int = 0
+    busy_time: float = 0.0
+    max_queue_depth: int = 0
+
+    @property
+    def throughput(self):
+        "Items per busy second of a single worker"
+        return self.processed / self.busy_time if self.busy_time else 0.0
+
+
+@dataclass
+class Stage:
+    name: str
+    func: object
+    workers: int = 1
+    # Run `func` in a process pool, `func` and items must be picklable then
+    processes: bool = False
+    initializer: object = None
+    initargs: tuple = ()
+    queue_size: int = 1024
+    stats: StageStats = field(default_factory=StageStats)
+
+
+class Pipeline:
+    def __init__(self, stages, output_size=1024):
+        self.stages = stages
+        self.output_size = output_size
+        # (stage name, item, exception) of failed items, which are dropped
+        self.errors = []
+        self._lock = threading.Lock()
+
+    def run(self, items):
+        """Feed items through stages and yield the outputs, in no particular order.
+        An exception raised by `items` is raised here, once the items before it are through.
+        """
+        queues = [Queue(stage.queue_size) for stage in self.stages] + [Queue(self.output_size)]
+        executors = [
+            ProcessPoolExecutor(stage.workers, initializer=stage.initializer, initargs=stage.initargs)
+            if stage.processes else None
+            for stage in self.stages
+        ]
+        # Set once the consumer stops, so blocked threads give up
+        stop = threading.Event()
+        feed_error = []
+        threads = []
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            for _ in range(stage.workers):
+                thread = threading.Thread(
+                    target=self._work,
+                    args=(stage, executors[i], queues[i], queues[i + 1], remaining, self._consumers(i + 1), stop),
+                    daemon=True,
+                )
+                thread.start()
+                threads.append(thread)
+        feeder = threading.Thread(
+            target=self._feed, args=(items, queues[0], self._consumers(0), stop, feed_error), daemon=True,
+        )
+        feeder.start()
+        threads.append(feeder)
+
+        try:
+            output = queues[-1]
+            while True:
+                item = output.get()
+                if item is _DONE:
+                    break
+                yield item
+            if feed_error:
+                raise feed_error[0]
+        finally:
+            stop.set()
+            for thread in threads:
+                thread.join()
+            for executor in executors:
+                if executor is not None:
+                    executor.shutdown()
+
+    def _consumers(self, i):
+        return self.stages[i].workers if i < len(self.stages) else 1
+
+    def _feed(self, items, queue, consumers, stop, error):
+        try:
+            for item in items:
+                if not _put(queue, item, stop):
+                    return
+        except Exception as e:
+            error.append(e)
+        finally:
+            for _ in range(consumers):
+                _put(queue, _DONE, stop)
+
+    def _work(self, stage, executor, inbox, outbox, remaining, consumers, stop):
+        stats = stage.stats
+        while True:
+            depth = inbox.qsize()
+            item = _get(inbox, stop)
+            if item is _DONE:
+                break
+            start = time.perf_counter()
+            try:
+                if executor is not None:
+                    result = executor.submit(stage.func, item).result()
+                else:
+                    result = stage.func(item)
+            except Exception as e:
+                result = None
+                with self._lock:
+                    self.errors.append((stage.name, item, e))
+            with self._lock:
+                stats.busy_time += time.perf_counter() - start
+                stats.max_queue_depth = max(stats.max_queue_depth, depth)
+                stats.processed += 1
+                if result is None:
+                    stats.dropped += 1
+            if result is not None and not _put(outbox, result, stop):
+                return
+
+        # The last worker of a stage closes the next one
+        with self._lock:
+            remaining[0] -= 1
+            last = remaining[0] == 0
+        if last:
+            for _ in range(consumers):
+                _put(outbox, _DONE, stop)
+
+    def stats(self):
+        return {stage.name: stage.stats for stage in self.stages}
+
+
+# --- Stages around Costflow ---
+_costflow = None
+
+
+def init_costflow(conf=None):
+    "Initializer of parse worker processes"
+    global _costflow
+    _costflow = Costflow(conf, global_config=False)
+
+
+def parse(line):
+    return _costflow.parse(line) if line.strip() else None
+
+
+def _thread_parse(conf):
+    "Parse function of a thread stage, its parser is built on first use"
+    costflow = None
+
+    def parse(line):
+        nonlocal costflow
+        if costflow is None:
+            costflow = Costflow(conf, global_config=False)
+        return costflow.parse(line) if line.strip() else None
+    return parse
+
+
+def render(entry):
+    return entry.render()
+
+
+def import_stages(conf=None, parse_processes=0, deduper=None, writer=None, write_workers=4):
+    """Stages of parse -> (dedupe) -> (accept) -> (write) -> render.
+    Parsing runs in `parse_processes` processes, or a single thread since a parser is not thread-safe.
+    Entries which pass dedupe are accepted into the accounts and the balance index of `conf`,
+    parse processes only see them as they were when they started.
+    Writing blocks until entries are durable, so concurrent writers share group commits.
+    """
+    if parse_processes:
+        stages = [Stage("parse", parse, parse_processes, processes=True, initializer=init_costflow, initargs=(conf, ))]
+    else:
+        stages = [Stage("parse", _thread_parse(conf))]
+    if deduper is not None:
+        # The index is not thread-safe, keep a single worker
+        stages.append(Stage("dedupe", lambda entry: next(deduper.filter([entry]), None)))
+    if conf is not None and (conf.balances is not None or conf.accounts is not None):
+        def accept(entry):
+            conf.accept(entry)
+            if conf.balances is not None:
+                conf.balances.add(entry)
+            return entry
+        stages.append(Stage("accept", accept))
+    if writer is not None:
+        def write(entry):
+            writer.write(entry)
+            return entry
+        stages.append(Stage("write", write, write_workers))
+    stages.append(Stage("render", render))
+    return stages
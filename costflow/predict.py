@@ -0,0 +1,105 @@
+"""Posting prediction learned from payee history.
+
+Every accepted transaction records its posting accounts under its payee and
+the tokens of its narration. A transaction with missing accounts is then
+completed by the most frequent account set of its payee.
+"""
+import json
+from bisect import bisect_left, insort
+from collections import Counter
+from .definitions import Posting, Transaction
+
+
+def _tokens(desc):
+    return set(desc.lower().split())
+
+
+class PostingPredictor:
+    def __init__(self):
+        # payee or narration token -> Counter of account tuples
+        self.payees = {}
+        self.tokens = {}
+        self.accounts = Counter()
+        # Sorted names for prefix lookup
+        self._payee_names = []
+        self._account_names = []
+
+    def learn(self, trx):
+        accounts = tuple(posting.account for posting in trx.postings)
+        if None in accounts:
+            return
+        payee = str(trx.narration.payee)
+        if payee:
+            if payee not in self.payees:
+                insort(self._payee_names, payee)
+            self.payees.setdefault(payee, Counter())[accounts] += 1
+        for token in _tokens(trx.narration.desc):
+            self.tokens.setdefault(token, Counter())[accounts] += 1
+        for account in accounts:
+            if account not in self.accounts:
+                insort(self._account_names, account)
+            self.accounts[account] += 1
+
+    def load(self, entries):
+        for entry in entries:
+            if isinstance(entry, Transaction):
+                self.learn(entry)
+
+    def predict(self, payee, desc=""):
+        "Account sets ranked by frequency, by payee first and narration tokens then"
+        counter = self.payees.get(str(payee))
+        if counter is None:
+            counter = Counter()
+            for token in _tokens(desc):
+                counter.update(self.tokens.get(token, {}))
+        return [accounts for accounts, _ in counter.most_common()]
+
+    def complete(self, trx):
+        "Fill missing accounts and postings, return whether all postings have accounts"
+        present = [p.account for p in trx.postings if p.account is not None]
+        for accounts in self.predict(trx.narration.payee, trx.narration.desc):
+            if not set(present) <= set(accounts):
+                continue
+            missing = [account for account in accounts if account not in present]
+            for posting in trx.postings:
+                if posting.account is None and missing:
+                    posting.account = missing.pop(0)
+            if len(trx.postings) < 2:
+                trx.postings.extend(Posting(account) for account in missing)
+            break
+        return all(p.account is not None for p in trx.postings)
+
+    @staticmethod
+    def _suggest(names, counter, prefix, limit):
+        pos = bisect_left(names, prefix)
+        matches = []
+        while pos < len(names) and names[pos].startswith(prefix):
+            matches.append(names[pos])
+            pos += 1
+        return sorted(matches, key=lambda name: -counter(name))[:limit]
+
+    def suggest_payees(self, prefix, limit=10):
+        return self._suggest(self._payee_names, lambda name: sum(self.payees[name].values()), prefix, limit)
+
+    def suggest_accounts(self, prefix, limit=10):
+        return self._suggest(self._account_names, self.accounts.__getitem__, prefix, limit)
+
+    def save(self, path):
+        def dump(index):
+            return {key: [[*accounts, count] for accounts, count in counter.items()] for key, counter in index.items()}
+
+        with open(path, "w", encoding="utf-8") as f:
+            data = {"payees": dump(self.payees), "tokens": dump(self.tokens), "accounts": self.accounts}
+            json.dump(data, f, ensure_ascii=False, separators=(",", ":"))
+
+    def load_file(self, path):
+        def load(data):
+            return {key: Counter({tuple(row[:-1]): row[-1] for row in rows}) for key, rows in data.items()}
+
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+        self.payees = load(data["payees"])
+        self.tokens = load(data["tokens"])
+        self.accounts = Counter(data["accounts"])
+        self._payee_names = sorted(self.payees)
+        self._account_names = sorted(self.accounts)
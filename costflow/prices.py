@@ -0,0 +1,61 @@
+"""Time-indexed price lookup built from `price` directives."""
+from bisect import bisect_right
+from decimal import Decimal
+from . import config
+from .definitions import Price, date_ordinal
+
+
+class PriceIndex:
+    def __init__(self):
+        # (commodity, currency) -> ([date ordinals], [rates]), sorted by date
+        self.prices = {}
+
+    def add(self, price):
+        dates, rates = self.prices.setdefault((price.commodity, price.currency), ([], []))
+        date_ = date_ordinal(price.get_date())
+        if not dates or date_ >= dates[-1]:
+            dates.append(date_)
+            rates.append(price.amount)
+        else:
+            pos = bisect_right(dates, date_)
+            dates.insert(pos, date_)
+            rates.insert(pos, price.amount)
+
+    def load(self, entries):
+        for entry in entries:
+            if isinstance(entry, Price):
+                self.add(entry)
+
+    def _lookup(self, commodity, currency, ordinal):
+        series = self.prices.get((commodity, currency))
+        if series is None:
+            return None
+        dates, rates = series
+        pos = bisect_right(dates, ordinal)
+        if pos == 0:
+            return None
+        return rates[pos - 1]
+
+    def get_rate(self, commodity, currency, date_):
+        "Latest rate of `commodity` in `currency` on or before `date_`, None if unknown"
+        if commodity == currency:
+            return Decimal(1)
+        ordinal = date_.toordinal()
+        rate = self._lookup(commodity, currency, ordinal)
+        if rate is None:
+            rate = self._lookup(currency, commodity, ordinal)
+            if rate:
+                rate = 1 / rate
+        return rate
+
+    def convert(self, amount, currency, date_, target=None):
+        "Convert amount into `target` (default currency by default), None if no price found"
+        if target is None:
+            target = config.config.default_currency
+        rate = self.get_rate(currency, target, date_)
+        if rate is None:
+            return None
+        return amount * rate
+
+    def convert_posting(self, posting, date_, target=None):
+        return self.convert(posting.amount, posting.currency, date_, target)
@@ -0,0 +1,151 @@
+"""Random access reader for huge input files.
+
+The file is memory-mapped and only the start offset of every line is kept,
+so lines are sliced out of the page cache on demand instead of being loaded.
+Line numbers are zero-based.
+"""
+import mmap
+import os
+from array import array
+from collections import deque
+from multiprocessing import Pool
+from . import serialize
+from .costflow import Costflow
+
+
+class LineIndex:
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        # Empty files can not be mapped
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else b""
+        self.offsets = self._build_offsets()
+
+    def _build_offsets(self):
+        # offsets[i] is the start of line i, the last item is the file size
+        offsets = array("Q", [0])
+        find = self._map.find
+        pos = find(b"\n")
+        while pos != -1:
+            offsets.append(pos + 1)
+            pos = find(b"\n", pos + 1)
+        if offsets[-1] != len(self._map):
+            offsets.append(len(self._map))
+        return offsets
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def line(self, lineno):
+        return _decode(self._map[self.offsets[lineno]:self.offsets[lineno + 1]])
+
+    def lines(self, start=0, stop=None):
+        "Yield (lineno, line) in range [start, stop)"
+        stop = len(self) if stop is None else min(stop, len(self))
+        offsets = self.offsets
+        for lineno in range(start, stop):
+            yield lineno, _decode(self._map[offsets[lineno]:offsets[lineno + 1]])
+
+    def split(self, size, start=0, stop=None):
+        "Split line range [start, stop) into chunks of `size` lines"
+        stop = len(self) if stop is None else min(stop, len(self))
+        return [(i, min(i + size, stop)) for i in range(start, stop, size)]
+
+    def byte_range(self, start, stop):
+        return self.offsets[start], self.offsets[stop]
+
+
+def _decode(raw):
+    return raw.decode("utf-8").rstrip("\r\n")
+
+
+def parse_lines(costflow, lines):
+    "Parse (lineno, line) pairs, blank lines are skipped"
+    for lineno, line in lines:
+        if line.strip():
+            yield lineno, costflow.parse(line)
+
+
+# --- Parallel parsing ---
+_worker_costflow = None
+
+
+def _init_worker(conf):
+    global _worker_costflow
+    _worker_costflow = Costflow(conf, global_config=False)
+
+
+def _parse_chunk(args):
+    # Workers map the file by themselves, only byte ranges are sent to them
+    path, first_lineno, begin, end = args
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+        lines = enumerate(map(_decode, m[begin:end].split(b"\n")), first_lineno)
+        return [(lineno, serialize.encode(entry)) for lineno, entry in parse_lines(_worker_costflow, lines)]
+
+
+def _read_checkpoint(path):
+    try:
+        with open(path) as f:
+            return int(f.read().strip() or 0)
+    except FileNotFoundError:
+        return 0
+
+
+def _write_checkpoint(path, lineno):
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        f.write(str(lineno))
+    os.replace(tmp, path)
+
+
+def _consume(task, checkpoint):
+    end, result = task
+    for lineno, row in result.get():
+        yield lineno, serialize.decode(row)
+    if checkpoint is not None:
+        _write_checkpoint(checkpoint, end)
+
+
+def parse_file(path, conf=None, start=0, stop=None, processes=None, chunk_size=10000, checkpoint=None):
+    """Parse a file line by line, and yield (lineno, entry) in order.
+
+    With `processes`, chunks of `chunk_size` lines are parsed by a process pool,
+    at most `processes * 2` chunks at a time.
+    The global config is left as it is, `conf` is only used by this parse.
+    With `checkpoint`, the next line to be parsed is saved to the file after every
+    chunk is consumed, and parsing resumes from there.
+    """
+    if checkpoint is not None:
+        start = max(start, _read_checkpoint(checkpoint))
+
+    with LineIndex(path) as index:
+        chunks = index.split(chunk_size, start, stop)
+        if processes:
+            with Pool(processes, initializer=_init_worker, initargs=(conf, )) as pool:
+                # A bounded window of chunks is in flight, so results do not pile up for a slow consumer
+                pending = deque()
+                for begin, end in chunks:
+                    task = (path, begin, *index.byte_range(begin, end))
+                    pending.append((end, pool.apply_async(_parse_chunk, (task, ))))
+                    if len(pending) >= processes * 2:
+                        yield from _consume(pending.popleft(), checkpoint)
+                while pending:
+                    yield from _consume(pending.popleft(), checkpoint)
+        else:
+            costflow = Costflow(conf, global_config=False)
+            for begin, end in chunks:
+                yield from parse_lines(costflow, index.lines(begin, end))
+                if checkpoint is not None:
+                    _write_checkpoint(checkpoint, end)
@@ -2,14 +2,13 @@ from datetime import date, datetime, timedelta
 from dateutil import parser as dateparse
 from decimal import Decimal, InvalidOperation
 from .definitions import (
-    Balance, KVEntry, Option, Pad, Transaction,
+    Balance, KVEntry, Option, Pad, Price, Transaction,
     Payee, Narration, Posting, Comment, UnaryEntry,
     CostflowSyntaxError,
 )
 from ply import lex
 
 
-# TODO: Implement other commands (price)
 # -------------- lexer -------------
 reserved = {
     'open': 'OPEN',
@@ -17,7 +16,7 @@ reserved = {
     'commodity': 'COMMODITY',
     'balance': 'BALANCE',
     'pad': 'PAD',
-    # 'price': 'PRICE',
+    'price': 'PRICE',
 }
 
 kv_directives = {
@@ -44,7 +43,8 @@ tokens = [
 literals = "@!*|+>"
 
 
-@lex.Token(f"({'|'.join(reserved.keys())})")
+# Match whole words only, so "@priceline" is not split into a directive
+@lex.Token(rf"({'|'.join(reserved.keys())})\b")
 def t_RESERVED(t):
     type_ = reserved.get(t.value, None)
     if type_:
@@ -56,7 +56,7 @@ def t_RESERVED(t):
     return t_STRING(t)
 
 
-@lex.Token(f"({'|'.join(kv_directives.keys())})")
+@lex.Token(rf"({'|'.join(kv_directives.keys())})\b")
 def t_KV(t):
     type_ = kv_directives.get(t.value, None)
     if type_:
@@ -190,6 +190,20 @@ t_anyvalue_STRING = r".+"
 t_anyvalue_LETERAL = t_STRING_LETERAL
 
 # ------------- Grammar analyzer -----------
+# Names in account, currency and payee positions are interned, within the table of the lexer
+_INTERN_LIMIT = 65536
+
+
+def _intern(t, value):
+    strings = getattr(t.lexer, "strings", None)
+    if strings is None or value is None:
+        return value
+    # Start over rather than grow without a bound
+    if len(strings) >= _INTERN_LIMIT:
+        strings.clear()
+    return strings.setdefault(value, value)
+
+
 # Statements
 precedence = (
     ('right', '@'),
@@ -198,7 +212,7 @@ precedence = (
 
 def p_entry_transaction(t):
     "entry : transaction"
-    t[1].build()
+    t[1].build(getattr(t.lexer, "conf", None))
     t[0] = t[1]
 
 
@@ -209,14 +223,15 @@ def p_entry_open_close(t):
              | note
              | balance
              | pad"""
-    t[1].build()
+    t[1].build(getattr(t.lexer, "conf", None))
     t[0] = t[1]
 
 
 def p_normal_entry(t):
     """entry : option
              | event
-             | commodity"""
+             | commodity
+             | price"""
     t[0] = t[1]
 
 
@@ -224,7 +239,7 @@ def p_normal_entry(t):
 # --- Transaction ---
 def p_payee(t):
     "payee : '@' STRING"
-    t[0] = Payee(t[2])
+    t[0] = Payee(_intern(t, t[2]))
 
 
 def p_narration(t):
@@ -249,7 +264,7 @@ def p_narration(t):
     if len(t) == 3:
         payee = t[1]
         if not isinstance(payee, Payee):
-            payee = Payee(payee)
+            payee = Payee(_intern(t, payee))
         t[0] = Narration(payee=payee, desc=t[2])
     elif isinstance(t[1], Payee):
         t[0] = Narration(payee=t[1], desc="")
@@ -262,9 +277,9 @@ def p_posting(t):
                | NAME AMOUNT
     """
     if len(t) == 3:
-        t[0] = Posting(t[1], t[2])
+        t[0] = Posting(_intern(t, t[1]), t[2])
     else:
-        t[0] = Posting(t[1], t[3], t[2])
+        t[0] = Posting(_intern(t, t[1]), t[3], _intern(t, t[2]))
 
 
 def p_rev_posting(t):
@@ -272,16 +287,21 @@ def p_rev_posting(t):
                    | NAME NAME
                    | AMOUNT NAME
                    | NAME
+                   | AMOUNT
     """
     if len(t) == 2:
-        t[0] = Posting(account=t[1], amount=None)
+        if isinstance(t[1], Decimal):
+            # Account is left for prediction
+            t[0] = Posting(account=None, amount=t[1])
+        else:
+            t[0] = Posting(account=_intern(t, t[1]), amount=None)
     elif len(t) == 3:
         if isinstance(t[1], Decimal):
-            t[0] = Posting(account=t[2], amount=t[1])
+            t[0] = Posting(account=_intern(t, t[2]), amount=t[1])
         else:
-            t[0] = Posting(account=t[2], currency=t[1])
+            t[0] = Posting(account=_intern(t, t[2]), currency=_intern(t, t[1]))
     else:
-        t[0] = Posting(t[3], t[1], t[2])    # amount currency account
+        t[0] = Posting(_intern(t, t[3]), t[1], _intern(t, t[2]))    # amount currency account
 
 
 def p_rev_postings(t):
@@ -337,7 +357,7 @@ def p_open_close(t):
         t[2].date_ = t[1]
         t[0] = t[2]
     else:
-        t[0] = UnaryEntry(t[1], t[2])
+        t[0] = UnaryEntry(t[1], _intern(t, t[2]))
 
 
 # --- Option ---
@@ -369,15 +389,32 @@ def p_event_note(t):
 
 def p_balance(t):
     """balance : BALANCE STRING NUMBER
+               | BALANCE STRING
                | DATE balance
                | balance STRING"""
     if len(t) == 4:
-        t[0] = Balance(t[2], t[3])
+        t[0] = Balance(_intern(t, t[2]), t[3])
+    elif t[1] == "balance":
+        t[0] = Balance(_intern(t, t[2]))
+    elif isinstance(t[1], date):
+        t[2].date_ = t[1]
+        t[0] = t[2]
+    else:
+        t[1].currency = _intern(t, t[2])
+        t[0] = t[1]
+
+
+def p_price(t):
+    """price : PRICE STRING NUMBER
+             | DATE price
+             | price STRING"""
+    if len(t) == 4:
+        t[0] = Price(_intern(t, t[2]), t[3])
     elif isinstance(t[1], date):
         t[2].date_ = t[1]
         t[0] = t[2]
     else:
-        t[1].currency = t[2]
+        t[1].currency = _intern(t, t[2])
         t[0] = t[1]
 
 
@@ -385,7 +422,7 @@ def p_pad(t):
     """pad : PAD STRING STRING
            | DATE pad"""
     if len(t) == 4:
-        t[0] = Pad(t[2], t[3])
+        t[0] = Pad(_intern(t, t[2]), _intern(t, t[3]))
     else:
         t[2].date_ = t[1]
         t[0] = t[2]
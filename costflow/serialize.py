@@ -0,0 +1,144 @@
+"""JSON codecs for parsed entries.
+
+A single entry is encoded as one compact row, e.g.
+`["Balance","Assets:BofA","360","USD",736330]`, see `Entry.to_dict` for the
+value encoding. `dump` / `load` stream such rows as JSON lines.
+
+A batch (`dumps` / `loads`) is encoded column by column instead: entries are
+grouped by type and every field becomes one column, so values are converted
+a column at a time with `map`, and objects are built by mapping classes over
+columns. It is one JSON line per batch:
+`[[type names], [type index of each entry], [columns of each type]]`.
+"""
+import json
+from datetime import date
+from decimal import Decimal
+from dataclasses import fields, is_dataclass
+from functools import lru_cache, partial
+from itertools import chain
+from operator import attrgetter
+from .definitions import ENTRY_TYPES, Entry, Payee
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+_decoder = json.JSONDecoder()
+
+
+def encode(entry):
+    return _encoder.encode(entry.to_dict(compact=True))
+
+
+def decode(line):
+    return Entry.from_dict(_decoder.decode(line))
+
+
+def dumps(entries):
+    "Encode a batch of entries into a columnar JSON line"
+    entries = list(entries)
+    if not entries:
+        return ""
+    types = list(map(type, entries))
+    classes = list(dict.fromkeys(types))
+    if len(classes) == 1:
+        codes = []
+        groups = [entries]
+    else:
+        index = {cls: i for i, cls in enumerate(classes)}
+        codes = list(map(index.__getitem__, types))
+        groups = [[entry for entry, t in zip(entries, types) if t is cls] for cls in classes]
+    columns = [_encode_objects(cls, group) for cls, group in zip(classes, groups)]
+    return _encoder.encode([[cls.__name__ for cls in classes], codes, columns]) + "\n"
+
+
+def loads(text):
+    "Decode batches written by `dumps`, one per line"
+    entries = []
+    for line in text.splitlines():
+        if not line:
+            continue
+        names, codes, columns = _decoder.decode(line)
+        groups = [_decode_objects(ENTRY_TYPES[name], cols) for name, cols in zip(names, columns)]
+        if len(groups) == 1:
+            entries.extend(groups[0])
+        else:
+            nexts = [iter(group).__next__ for group in groups]
+            entries.extend([nexts[code]() for code in codes])
+    return entries
+
+
+def dump(entries, fp):
+    for entry in entries:
+        fp.write(encode(entry))
+        fp.write("\n")
+
+
+def load(fp):
+    "Lazily decode entries from a file object"
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield decode(line)
+
+
+# --- Columnar helpers ---
+def _optional(func):
+    "Convert a column with `func`, None is kept"
+    def convert(column):
+        if None in column:
+            return [None if v is None else func(v) for v in column]
+        return list(map(func, column))
+    return convert
+
+
+@lru_cache(maxsize=None)
+def _column_codec(type_):
+    "(encode, decode) of a column of `type_` values, None for plain values"
+    if type_ is Decimal:
+        return _optional(str), _optional(Decimal)
+    if type_ is date:
+        return _optional(date.toordinal), _optional(date.fromordinal)
+    if type_ is Payee:
+        return _optional(attrgetter("payee")), _optional(Payee)
+    if is_dataclass(type_):
+        return partial(_encode_objects, type_), partial(_decode_objects, type_)
+    if getattr(type_, "__origin__", None) is list:
+        encode_items, decode_items = _column_codec(type_.__args__[0])
+        return partial(_encode_lists, encode_items), partial(_decode_lists, decode_items)
+    return None, None
+
+
+@lru_cache(maxsize=None)
+def _class_codecs(cls):
+    return tuple((attrgetter(f.name), *_column_codec(f.type)) for f in fields(cls))
+
+
+def _encode_objects(cls, objs):
+    columns = []
+    for getter, encode_column, _ in _class_codecs(cls):
+        column = list(map(getter, objs))
+        columns.append(encode_column(column) if encode_column else column)
+    return columns
+
+
+def _decode_objects(cls, columns):
+    columns = [
+        decode_column(column) if decode_column else column
+        for (_, _, decode_column), column in zip(_class_codecs(cls), columns)
+    ]
+    return list(map(cls, *columns))
+
+
+def _encode_lists(encode_items, lists):
+    items = list(chain.from_iterable(lists))
+    return [list(map(len, lists)), encode_items(items) if encode_items else items]
+
+
+def _decode_lists(decode_items, data):
+    lengths, items = data
+    if decode_items:
+        items = decode_items(items)
+    lists = []
+    pos = 0
+    for length in lengths:
+        lists.append(items[pos:pos + length])
+        pos += length
+    return lists
@@ -0,0 +1,164 @@
+"""Prefork HTTP parse service.
+
+The parent builds the parser tables, compiles formulas and loads the ledger
+context once, then freezes the GC and forks workers which accept on the
+same socket. The warm state is shared copy-on-write, frozen objects are
+never touched by the collector of workers, so their pages stay shared.
+
+Endpoints, both take and return JSON:
+    POST /parse         {"text": "..."} -> {"rendered": "...", "entry": {...}}
+    POST /parse_many    {"lines": ["...", ...]} -> {"entries": [{"rendered": ..., "entry": ...}, ...]}
+                        with null for blank lines
+
+Usage: python -m costflow.server [--host HOST] [--port PORT] [--workers N] [--config PATH] [--ledger PATH]
+"""
+import argparse
+import gc
+import json
+import os
+import signal
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from . import utils
+from .balances import BalanceIndex
+from .config import Config
+from .costflow import Costflow
+from .definitions import CostflowLimitError
+from .predict import PostingPredictor
+from .reader import parse_file
+
+
+class ParseHandler(BaseHTTPRequestHandler):
+    # Set by `make_server`, a worker handles one request at a time
+    costflow = None
+    quiet = False
+
+    def do_POST(self):
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            data = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            return self._send(400, {"error": "Invalid JSON body"})
+        if not isinstance(data, dict):
+            return self._send(400, {"error": "JSON object is expected"})
+
+        try:
+            if self.path == "/parse":
+                text = data.get("text")
+                if not isinstance(text, str) or not text.strip():
+                    return self._send(400, {"error": "'text' is required"})
+                return self._send(200, self._parse(text))
+            if self.path == "/parse_many":
+                lines = data.get("lines")
+                if not isinstance(lines, list) or not all(isinstance(line, str) for line in lines):
+                    return self._send(400, {"error": "'lines' is required"})
+                # One result per line, so results map back to inputs
+                return self._send(200, {"entries": [self._parse(line) if line.strip() else None for line in lines]})
+        except CostflowLimitError as e:
+            return self._send(413, {"error": str(e), "reason": e.reason})
+        except Exception as e:
+            self.log_error("Failed to parse: %r", e)
+            return self._send(500, {"error": "Internal error"})
+        self._send(404, {"error": "Not found"})
+
+    def _parse(self, text):
+        entry = self.costflow.parse(text)
+        # Render first, it fills the date of undated entries
+        rendered = entry.render()
+        return {"rendered": rendered, "entry": entry.to_dict()}
+
+    def _send(self, status, data):
+        body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        if not self.quiet:
+            super().log_message(format, *args)
+
+    def log_error(self, format, *args):
+        # Errors are logged even if requests are not
+        super().log_message(format, *args)
+
+
+def warm(conf=None, ledger=None):
+    "Build the parser and the state shared by workers"
+    conf = conf or Config()
+    if ledger:
+        # The ledger is parsed on its own, then loaded as the context
+        entries = [entry for _, entry in parse_file(ledger, Config(formulas=conf.formulas))]
+        conf.balances = BalanceIndex()
+        conf.balances.load(entries)
+        conf.predictor = PostingPredictor()
+        conf.predictor.load(entries)
+        for entry in entries:
+            conf.accept(entry)
+    costflow = Costflow(conf)
+    for formula in conf.formulas.values():
+        utils.compile_formula(formula)
+    return costflow
+
+
+def make_server(address, costflow, quiet=False):
+    handler = type("Handler", (ParseHandler, ), {"costflow": costflow, "quiet": quiet})
+    return HTTPServer(address, handler)
+
+
+def serve(address, conf=None, workers=None, ledger=None, quiet=False):
+    """Serve with prefork workers until SIGINT or SIGTERM.
+    Parsing never updates the ledger context, it stays as the parent loaded it.
+    """
+    server = make_server(address, warm(conf, ledger), quiet)
+    workers = workers or os.cpu_count() or 1
+
+    # Keep the warm state out of the collector, so workers never write to its pages
+    gc.disable()
+    gc.freeze()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            gc.enable()
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            try:
+                server.serve_forever()
+            finally:
+                os._exit(0)
+        children.append(pid)
+    gc.enable()
+
+    def stop(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    try:
+        for pid in children:
+            os.waitpid(pid, 0)
+    finally:
+        server.server_close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Costflow prefork HTTP parse service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, help="Number of worker processes, CPU count by default")
+    parser.add_argument("--config", help="Config file, in JSON, TOML or YAML")
+    parser.add_argument("--ledger", help="Costflow input file loaded as ledger context")
+    parser.add_argument("--quiet", action="store_true", help="Do not log requests")
+    args = parser.parse_args(argv)
+
+    conf = Config.load(args.config) if args.config else Config()
+    serve((args.host, args.port), conf, args.workers, args.ledger, args.quiet)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Shadow mode for alternate parser engines.
+
+A sampled fraction of the inputs of `Costflow.parse` is parsed again by a
+candidate engine, and its entry and rendered output are compared with the
+reference result. The reference result is always the one returned.
+"""
+import random
+import time
+from copy import deepcopy
+from dataclasses import dataclass
+
+
+@dataclass
+class Mismatch:
+    inputs: str
+    expected: object
+    got: object = None
+    error: Exception = None
+
+
+class ShadowRunner:
+    """Compare a candidate engine with the reference one.
+
+    `candidate` is a callable from the input string to an entry, and should
+    have no side effects on the ledger context, such as building entries
+    into the balance index.
+    """
+    def __init__(self, candidate, sample_rate=0.01, max_mismatches=100, seed=None):
+        self.candidate = candidate
+        self.sample_rate = sample_rate
+        self.max_mismatches = max_mismatches
+        self.samples = 0
+        self.errors = 0
+        self.mismatch_count = 0
+        self.mismatches = []
+        self.reference_time = 0.0
+        self.candidate_time = 0.0
+        self._random = random.Random(seed)
+
+    @property
+    def speed_ratio(self):
+        "How many times faster the candidate is, on the sampled inputs"
+        return self.reference_time / self.candidate_time if self.candidate_time else 0.0
+
+    def sample(self):
+        return self._random.random() < self.sample_rate
+
+    def observe(self, inputs, result, elapsed):
+        "Run the candidate on the inputs, `result` is the reference entry parsed in `elapsed` seconds"
+        # Render on copies, rendering fills dates of the entries
+        expected = deepcopy(result)
+        start = time.perf_counter()
+        try:
+            got = self.candidate(inputs)
+        except Exception as e:
+            self.errors += 1
+            self._record(Mismatch(inputs, expected, error=e))
+            return
+        finally:
+            self.candidate_time += time.perf_counter() - start
+            self.reference_time += elapsed
+            self.samples += 1
+
+        try:
+            same = got == expected and deepcopy(got).render() == deepcopy(expected).render()
+        except Exception as e:
+            self.errors += 1
+            self._record(Mismatch(inputs, expected, got, e))
+            return
+        if not same:
+            self._record(Mismatch(inputs, expected, got))
+
+    def _record(self, mismatch):
+        self.mismatch_count += 1
+        # Keep the first ones, a broken candidate mismatches on everything
+        if len(self.mismatches) < self.max_mismatches:
+            self.mismatches.append(mismatch)
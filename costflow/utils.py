@@ -1,4 +1,10 @@
-from jinja2 import Environment, meta
+import re
+from functools import lru_cache
+from jinja2 import Environment, Template, meta
+
+ACCOUNT_TYPES = ("Assets", "Liabilities", "Equity", "Income", "Expenses")
+# Letters (of any script), digits and dashes, no underscore
+_ACCOUNT_COMPONENT = re.compile(r"[^\W_](?:[^\W_]|-)*")
 
 
 def fetch_variables(tmpl):
@@ -7,6 +13,28 @@ def fetch_variables(tmpl):
     return meta.find_undeclared_variables(ast)
 
 
-def check_account(account):
-    # TODO: Check account name (utf-8 validation)
-    pass
+@lru_cache(maxsize=1024)
+def compile_formula(formula):
+    "Compile formula into a template with its variables, compiled once per formula"
+    return Template(formula), fetch_variables(formula)
+
+
+@lru_cache(maxsize=65536)
+def _is_valid_account(account):
+    root, *components = account.split(":")
+    if root not in ACCOUNT_TYPES or not components:
+        return False
+    for component in components:
+        # Components start with a capital letter or a digit, letters without case (e.g. CJK) are fine
+        if not _ACCOUNT_COMPONENT.fullmatch(component) or component[0].islower():
+            return False
+    return True
+
+
+def check_account(account, known=None):
+    """Check account name like "Assets:Bank:BofA", and its membership in `known` accounts if given.
+    Names are validated once, then cached.
+    """
+    if not _is_valid_account(account):
+        return False
+    return known is None or account in known
@@ -0,0 +1,166 @@
+"""Incremental parsing for a growing "inbox" file.
+
+Lines are tracked by content hash (and occurrence, for repeated lines), so a
+line is only parsed again when its content changes, even if it moved.
+
+`update_file` keeps the offset after the last complete line it has seen and
+a hash of the content before it. While that prefix is unchanged, as in an
+append-only inbox, only the bytes after the offset are split and diffed.
+Checking the prefix still reads it, but hashes it in blocks without handling
+its lines. A prefix which changed falls back to diffing the whole file.
+"""
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from .definitions import Entry
+
+
+@dataclass
+class Delta:
+    "Items are (lineno, entry), line numbers of removed entries refer to the previous version"
+    added: list = field(default_factory=list)
+    changed: list = field(default_factory=list)
+    removed: list = field(default_factory=list)
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+
+def _digest(line):
+    return blake2b(line.encode("utf-8"), digest_size=8).hexdigest()
+
+
+class IncrementalParser:
+    def __init__(self, costflow):
+        self.costflow = costflow
+        # (digest, occurrence) -> (lineno, entry)
+        self.entries = {}
+        self._reset_prefix()
+
+    def _reset_prefix(self):
+        # Complete lines known to be unchanged by `update_file`: their byte size, hash,
+        # number of lines, and occurrences of every line digest among them
+        self._offset = 0
+        self._hash = blake2b(digest_size=16)
+        self._lines = 0
+        self._occurrences = {}
+        # Entries after the prefix, which are diffed again
+        self._tail = {}
+
+    def update(self, lines):
+        "Parse new or changed lines and return the delta against last update"
+        self._reset_prefix()
+        current, delta = self._diff(lines, 0, self.entries)
+        self.entries = current
+        return delta
+
+    def _diff(self, lines, start, previous):
+        "Diff lines numbered from `start` against `previous`, the entries at or after that line"
+        base = self._occurrences
+        current, occurrences = {}, {}
+        added = []
+        for lineno, line in enumerate(lines, start):
+            line = line.rstrip("\r\n")
+            if not line.strip():
+                continue
+            digest = _digest(line)
+            occurrences[digest] = occurrences.get(digest, 0) + 1
+            key = (digest, base.get(digest, 0) + occurrences[digest])
+            if key in previous:
+                current[key] = (lineno, previous[key][1])
+            else:
+                current[key] = (lineno, self.costflow.parse(line))
+                added.append(current[key])
+
+        removed = {
+            lineno: (lineno, entry)
+            for key, (lineno, entry) in previous.items()
+            if key not in current
+        }
+        delta = Delta()
+        for lineno, entry in added:
+            # A line replaced in place is a change
+            if removed.pop(lineno, None) is not None:
+                delta.changed.append((lineno, entry))
+            else:
+                delta.added.append((lineno, entry))
+        delta.removed = sorted(removed.values(), key=lambda item: item[0])
+        return current, delta
+
+    def update_file(self, path):
+        with open(path, "rb") as f:
+            if self._offset and self._prefix_unchanged(f):
+                data = f.read()
+                # Only entries after the prefix can change
+                tail = {key: item for key, item in self._tail.items() if key in self.entries}
+                for key in tail:
+                    del self.entries[key]
+            else:
+                self._reset_prefix()
+                f.seek(0)
+                data = f.read()
+                tail = self.entries
+                self.entries = {}
+
+        # The last line may still be written, it is not added to the prefix until it is complete
+        complete, newline, partial = data.rpartition(b"\n")
+        lines = complete.decode("utf-8").split("\n") if newline else []
+        lines.append(partial.decode("utf-8"))
+        current, delta = self._diff(lines, self._lines, tail)
+        self.entries.update(current)
+
+        if newline:
+            self._hash.update(complete + newline)
+            self._offset += len(complete) + 1
+            self._lines += len(lines) - 1
+            for (digest, _), (lineno, _) in current.items():
+                if lineno < self._lines:
+                    self._occurrences[digest] = self._occurrences.get(digest, 0) + 1
+        self._tail = {key: item for key, item in current.items() if item[0] >= self._lines}
+        return delta
+
+    def _prefix_unchanged(self, f):
+        "Hash the first `_offset` bytes of the file, and leave it right after them"
+        hasher = blake2b(digest_size=16)
+        remaining = self._offset
+        while remaining:
+            chunk = f.read(min(remaining, 1 << 20))
+            if not chunk:
+                return False
+            hasher.update(chunk)
+            remaining -= len(chunk)
+        return hasher.digest() == self._hash.digest()
+
+    def save(self, path):
+        "Save the state, so the next run only parses lines changed in between"
+        with open(path, "w", encoding="utf-8") as f:
+            for (digest, n), (lineno, entry) in self.entries.items():
+                f.write(json.dumps([digest, n, lineno, entry.to_dict(compact=True)], ensure_ascii=False))
+                f.write("\n")
+
+    def load(self, path):
+        self.entries = {}
+        self._reset_prefix()
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                digest, n, lineno, row = json.loads(line)
+                self.entries[(digest, n)] = (lineno, Entry.from_dict(row))
+
+
+def watch(path, parser, interval=1.0):
+    "Poll the file, and yield a delta once it is modified"
+    last = None
+    while True:
+        try:
+            stat = os.stat(path)
+            signature = (stat.st_mtime_ns, stat.st_size)
+        except FileNotFoundError:
+            signature = None
+        if signature != last:
+            last = signature
+            delta = parser.update_file(path) if signature else parser.update([])
+            if delta:
+                yield delta
+        time.sleep(interval)
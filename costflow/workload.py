@@ -0,0 +1,221 @@
+"""Seeded generator of synthetic costflow inputs, for benchmarks and load tests.
+
+Every line is a single input of `Costflow.parse`. Lines are drawn from a mix
+of kinds which covers the productions of `rules.py`, and the same seed
+always yields the same lines.
+
+Usage: python -m costflow.workload [--seed N] [--count N] [--output PATH]
+"""
+import argparse
+import random
+import sys
+from datetime import date, timedelta
+from itertools import islice
+from .config import Config
+
+# Weights of line kinds
+DEFAULT_MIX = {
+    "transaction": 40,      # narration rev_postings > rev_postings
+    "split": 10,            # '+' split postings
+    "pipe": 8,              # narration | posting | posting
+    "formula": 8,           # f name args
+    "formula_fallback": 4,  # name args
+    "open": 3,
+    "close": 1,
+    "commodity": 1,
+    "balance": 4,
+    "pad": 1,
+    "price": 3,
+    "note": 2,
+    "event": 1,
+    "option": 1,
+    "comment": 3,
+    "fallback": 3,          # free text, falls back to comment
+}
+
+ROOTS = ["Assets", "Liabilities", "Equity", "Income", "Expenses"]
+CATEGORIES = ["Bank", "Cash", "Card", "Food", "Travel", "Salary", "Rent", "Books", "Coffee", "Tax"]
+# Words must not start with directives, date abbreviations or months, which the lexer would pick up
+WORDS = ["lunch", "taxi", "groceries", "coffee", "gift", "snack", "ticket", "fuel", "movie", "haircut"]
+ALIASES = ["bofa", "visa", "cash", "alipay", "wechat"]
+DATE_ABBRS = ["yesterday", "ytd", "dby", "tomorrow", "tmr", "dat"]
+
+
+class Workload:
+    """Generate input lines.
+
+    `mix` maps line kinds to weights, `accounts` and `payees` are the
+    cardinality of names, `alias_ratio` is the share of short account
+    aliases, and `formulas` is the number of formulas in `config()`.
+    """
+    def __init__(self, seed=0, mix=None, accounts=200, payees=100, currencies=("CNY", "USD", "EUR"),
+                 formulas=10, alias_ratio=0.2, start=date(2021, 1, 1)):
+        self.seed = seed
+        self.mix = dict(DEFAULT_MIX if mix is None else mix)
+        self.currencies = list(currencies)
+        self.alias_ratio = alias_ratio
+        self.start = start
+
+        rand = random.Random(seed)
+        self.accounts = [
+            f"{rand.choice(ROOTS)}:{rand.choice(CATEGORIES)}{i}" for i in range(accounts)
+        ]
+        self.payees = [f"Payee{i}" for i in range(payees)]
+        self.formulas = {
+            f"formula{i}": rand.choice([
+                "{{ pre }} {{ amount }} %s > %s",
+                "{{ pre }} lunch {{ amount }} %s > %s",
+                "* {{ pre }} {{ amount }} %s + 1 %s > Expenses:Food",
+            ]) % (self._alias(rand), self._alias(rand))
+            for i in range(formulas)
+        }
+        self._formula_names = list(self.formulas)
+        self._kinds = list(self.mix)
+        self._weights = [self.mix[kind] for kind in self._kinds]
+
+    def config(self, **kwargs):
+        "Config with the generated formulas"
+        return Config(formulas=dict(self.formulas), **kwargs)
+
+    def lines(self, count=None):
+        "Yield `count` lines, or endlessly"
+        rand = random.Random(self.seed)
+        lines = (self.line(rand) for _ in iter(int, 1))
+        return islice(lines, count)
+
+    def kinds(self, count=None):
+        "Yield (kind, line) pairs"
+        rand = random.Random(self.seed)
+        pairs = (self.line(rand, with_kind=True) for _ in iter(int, 1))
+        return islice(pairs, count)
+
+    def line(self, rand, with_kind=False):
+        kind = rand.choices(self._kinds, self._weights)[0]
+        line = getattr(self, f"_{kind}")(rand)
+        return (kind, line) if with_kind else line
+
+    # --- Pieces ---
+    def _alias(self, rand):
+        return rand.choice(ALIASES)
+
+    def _account(self, rand):
+        if rand.random() < self.alias_ratio:
+            return self._alias(rand)
+        return rand.choice(self.accounts)
+
+    def _amount(self, rand):
+        return f"{rand.randint(1, 99999) / 100:.2f}"
+
+    def _currency(self, rand):
+        return rand.choice(self.currencies)
+
+    def _date(self, rand):
+        "ISO, abbreviation, '%b %d', or no date"
+        style = rand.randrange(6)
+        if style == 1:
+            return rand.choice(DATE_ABBRS) + " "
+        day = self.start + timedelta(rand.randrange(365))
+        if style == 2:
+            return day.strftime("%b %d ")
+        if style == 0 or style == 3:
+            return f"{day.isoformat()} "
+        return ""
+
+    def _narration(self, rand):
+        flag = rand.choice(["", "* ", "! "])
+        style = rand.randrange(4)
+        if style == 0:
+            return f"{flag}@{rand.choice(self.payees)}"
+        if style == 1:
+            return f"{flag}@{rand.choice(self.payees)} {rand.choice(WORDS)}"
+        if style == 2:
+            return f'{flag}"{rand.choice(self.payees)} shop" "{rand.choice(WORDS)} {rand.choice(WORDS)}"'
+        return f"{flag}{rand.choice(WORDS)}"
+
+    def _rev_posting(self, rand, amount=True):
+        style = rand.randrange(3) if amount else 3
+        if style == 0:
+            return f"{self._amount(rand)} {self._account(rand)}"
+        if style == 1:
+            return f"{self._amount(rand)} {self._currency(rand)} {self._account(rand)}"
+        if style == 2:
+            return f"-{self._amount(rand)} {self._account(rand)}"
+        return rand.choice([self._account(rand), f"{self._currency(rand)} {self._account(rand)}"])
+
+    # --- Line kinds ---
+    def _transaction(self, rand):
+        return (f"{self._date(rand)}{self._narration(rand)} {self._rev_posting(rand)} > "
+                f"{self._rev_posting(rand, amount=False)}")
+
+    def _split(self, rand):
+        froms = " + ".join(self._rev_posting(rand) for _ in range(rand.randint(1, 3)))
+        tos = " + ".join(self._rev_posting(rand, amount=False) for _ in range(rand.randint(1, 3)))
+        return f"{self._date(rand)}{self._narration(rand)} {froms} > {tos}"
+
+    def _pipe(self, rand):
+        amount = self._amount(rand)
+        return (f"{self._date(rand)}{self._narration(rand)} | {self._account(rand)} {self._currency(rand)} {amount}"
+                f" | {self._account(rand)} -{amount}")
+
+    def _formula(self, rand):
+        return f"f {self._formula_fallback(rand)}"
+
+    def _formula_fallback(self, rand):
+        # The payee makes the raw line a syntax error, so it falls back to the formula
+        return f"{rand.choice(self._formula_names)} {self._amount(rand)} @{rand.choice(self.payees)}"
+
+    def _open(self, rand):
+        return f"{self._date(rand)}open {rand.choice(self.accounts)}"
+
+    def _close(self, rand):
+        return f"{self._date(rand)}close {rand.choice(self.accounts)}"
+
+    def _commodity(self, rand):
+        return f"{self._date(rand)}commodity {self._currency(rand)}"
+
+    def _balance(self, rand):
+        return f"{self._date(rand)}balance {rand.choice(self.accounts)} {self._amount(rand)} {self._currency(rand)}"
+
+    def _pad(self, rand):
+        return f"{self._date(rand)}pad {rand.choice(self.accounts)} Equity:Opening"
+
+    def _price(self, rand):
+        return f"{self._date(rand)}price {self._currency(rand)} {self._amount(rand)} {self._currency(rand)}"
+
+    def _note(self, rand):
+        return f"{self._date(rand)}note {self._account(rand)} Called about {rand.choice(WORDS)}"
+
+    def _event(self, rand):
+        return f"{self._date(rand)}event location {rand.choice(['Paris, France', 'Tokyo', 'Beijing'])}"
+
+    def _option(self, rand):
+        return rand.choice(["option title Example ledger", 'option "operating_currency" "USD"'])
+
+    def _comment(self, rand):
+        return f"{rand.choice([';', '//'])} {rand.choice(WORDS)} {rand.choice(WORDS)}"
+
+    def _fallback(self, rand):
+        return f"{rand.choice(WORDS)} {rand.choice(WORDS)}"
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic costflow input lines")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--output", help="Output file, stdout by default")
+    args = parser.parse_args(argv)
+
+    workload = Workload(args.seed, accounts=args.accounts)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        for line in workload.lines(args.count):
+            out.write(line)
+            out.write("\n")
+    finally:
+        if out is not sys.stdout:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
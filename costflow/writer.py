@@ -0,0 +1,139 @@
+"""Group-commit writer appending entries into a beancount file.
+
+Entries submitted by many producers are rendered and appended in batches,
+with a single fsync per batch. A lock file keeps writers of different
+processes from interleaving.
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+
+
+class FileLock:
+    "Exclusive lock on `<path>.lock`, a no-op where flock is unavailable"
+    def __init__(self, path):
+        self.path = f"{path}.lock"
+        self._fd = None
+
+    def __enter__(self):
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_EX)
+        return self
+
+    def __exit__(self, *exc):
+        if fcntl is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+class LedgerWriter:
+    """Append entries in group commits.
+
+    A batch is committed once it has `max_batch` entries, or `max_delay`
+    seconds after its first entry arrives.
+    """
+    _STOP = object()
+
+    def __init__(self, path, max_batch=256, max_delay=0.01):
+        self.path = path
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.batches = 0
+        self._queue = queue.Queue()
+        # Guards `_closed`, so no entry is queued after the stop marker
+        self._lock = threading.Lock()
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def submit(self, entry, callback=None):
+        """Queue an entry, and return a future which is done once the entry is durable.
+        `callback` is called with the future then.
+        Raise RuntimeError once the writer is closed.
+        """
+        future = Future()
+        if callback is not None:
+            future.add_done_callback(callback)
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("Cannot submit to a closed writer")
+            self._queue.put((entry, future))
+        return future
+
+    def write(self, entry):
+        "Append an entry and wait until it is durable"
+        self.submit(entry).result()
+
+    def close(self):
+        "Commit queued entries and stop the writer"
+        with self._lock:
+            if not self._closed:
+                self._closed = True
+                self._queue.put(self._STOP)
+        self._thread.join()
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            item = self._queue.get()
+            if item is self._STOP:
+                return
+            batch = [item]
+            deadline = time.monotonic() + self.max_delay
+            while len(batch) < self.max_batch:
+                timeout = deadline - time.monotonic()
+                try:
+                    item = self._queue.get(timeout=timeout) if timeout > 0 else self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if item is self._STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            self._commit(batch)
+
+    def _commit(self, batch):
+        chunks, done = [], []
+        for entry, future in batch:
+            # An entry which fails to render or encode only fails its own future
+            try:
+                chunks.append(f"{entry.render()}\n\n".encode("utf-8"))
+                done.append(future)
+            except Exception as e:
+                future.set_exception(e)
+        if not chunks:
+            return
+
+        try:
+            with FileLock(self.path):
+                # Complete an insertion cut short by a crash before appending after it,
+                # imported here since the ledger module depends on this one
+                from .ledger import replay
+                replay(self.path)
+                with open(self.path, "ab") as f:
+                    f.write(b"".join(chunks))
+                    f.flush()
+                    os.fsync(f.fileno())
+        except Exception as e:
+            # Fail the batch, and keep the writer running for the next ones
+            for future in done:
+                future.set_exception(e)
+            return
+        self.batches += 1
+        for future in done:
+            future.set_result(None)
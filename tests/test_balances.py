@@ -0,0 +1,102 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from costflow import Costflow, config
+from costflow.balances import BalanceIndex
+from costflow.config import Config
+from costflow.definitions import (
+    Balance, Comment, Narration, Pad, Payee, Posting, Transaction,
+)
+
+
+def make_trx(day, amount, account="Assets:BofA", currency="USD"):
+    return Transaction(
+        narration=Narration(Payee(""), "", "*", date(2021, 1, day)),
+        postings=[
+            Posting(account, Decimal(amount), currency),
+            Posting("Expenses:Food", -Decimal(amount), currency),
+        ],
+    )
+
+
+def test_balance_index():
+    index = BalanceIndex()
+    index.load([make_trx(5, 10), make_trx(10, 20), make_trx(10, 1, currency="CNY"), make_trx(1, 100)])
+    assert index.balance("Assets:BofA", "USD", date(2021, 1, 1)) == 0
+    assert index.balance("Assets:BofA", "USD", date(2021, 1, 2)) == 100
+    assert index.balance("Assets:BofA", "USD", date(2021, 1, 10)) == 110
+    assert index.balance("Assets:BofA", "USD", date(2021, 2, 1)) == 130
+    assert index.balance("Assets:BofA", "CNY", date(2021, 2, 1)) == 1
+    assert index.balance("Expenses:Food", "USD", date(2021, 2, 1)) == -130
+    assert index.balance("Assets:Unknown", "USD", date(2021, 2, 1)) == 0
+
+    # An unsorted ledger is loaded in date order
+    days = []
+    recording = BalanceIndex()
+    recording.add_transaction = lambda trx: days.append(trx.get_date().day)
+    recording.load([make_trx(5, 10), make_trx(10, 20), make_trx(10, 1, currency="CNY"), make_trx(1, 100)])
+    assert days == [1, 5, 10, 10]
+
+    # Insert into the past
+    index.add_transaction(make_trx(3, 5))
+    assert index.balance("Assets:BofA", "USD", date(2021, 1, 4)) == 105
+    assert index.balance("Assets:BofA", "USD", date(2021, 2, 1)) == 135
+
+
+def test_check():
+    index = BalanceIndex()
+    index.load([make_trx(1, 100), Balance("Assets:BofA", Decimal(100), "USD", date(2021, 1, 2))])
+    assert index.mismatches == []
+
+    entry = Balance("Assets:BofA", None, "USD", date(2021, 1, 2))
+    assert index.check(entry)
+    assert entry.amount == 100
+
+    wrong = Balance("Assets:BofA", Decimal(99), "USD", date(2021, 1, 2))
+    assert not index.check(wrong)
+    assert index.mismatches == [(wrong, Decimal(100))]
+
+
+def test_pad():
+    index = BalanceIndex()
+    index.load([
+        make_trx(1, 100),
+        Pad("Assets:BofA", "Equity:Opening", date(2021, 1, 2)),
+        Balance("Assets:BofA", Decimal(150), "USD", date(2021, 1, 5)),
+        Comment("hi"),
+    ])
+    assert index.mismatches == []
+    assert index.balance("Assets:BofA", "USD", date(2021, 1, 3)) == 150
+    assert index.balance("Equity:Opening", "USD", date(2021, 1, 3)) == -50
+
+
+@pytest.fixture
+def costflow():
+    index = BalanceIndex()
+    index.add_transaction(make_trx(1, 100, currency="CNY"))
+    yield Costflow(Config(balances=index))
+    Costflow(Config())
+
+
+def test_parse_with_context(costflow):
+    got = costflow.parse("2021-01-03 balance Assets:BofA")
+    assert got == Balance("Assets:BofA", Decimal(100), "CNY", date(2021, 1, 3))
+
+    # Parsing never changes the index, accepted entries are added explicitly
+    trx = costflow.parse("2021-01-03 @KFC 10 Assets:BofA > Expenses:Food")
+    costflow.parse("2021-01-03 @KFC 10 Assets:BofA > Expenses:Food")
+    costflow.parse("2021-01-02 pad Assets:BofA Equity:Opening")
+    assert costflow.parse("2021-01-04 balance Assets:BofA").amount == Decimal(100)
+
+    index = config.config.balances
+    index.add(trx)
+    assert costflow.parse("2021-01-04 balance Assets:BofA").amount == Decimal(110)
+    wrong = costflow.parse("2021-01-04 balance Assets:BofA 1 CNY")
+    assert wrong.amount == Decimal(1)
+    index.add(wrong)
+    assert index.mismatches == [(wrong, Decimal(110))]
+
+
+def test_parse_without_context():
+    costflow = Costflow(Config())
+    assert costflow.parse("balance Assets:BofA") == Comment("balance Assets:BofA")
@@ -0,0 +1,74 @@
+import json
+import os
+from costflow import Costflow, config
+from costflow.config import Config, ConfigWatcher
+from costflow.balances import BalanceIndex
+from costflow.definitions import Posting
+
+
+def write(path, data, mtime):
+    path.write_text(json.dumps(data))
+    os.utime(path, (mtime, mtime))
+
+
+def test_load(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_text('{"default_currency": "USD", "formulas": {"btv": "{{ pre }} bofa > visa"}}')
+    assert Config.load(str(path)) == Config("USD", {"btv": "{{ pre }} bofa > visa"})
+
+    path = tmp_path / "config.toml"
+    path.write_text('default_currency = "USD"\n[formulas]\nbtv = "{{ pre }} bofa > visa"\n')
+    assert Config.load(str(path)) == Config("USD", {"btv": "{{ pre }} bofa > visa"})
+
+    path = tmp_path / "accounts.json"
+    path.write_text('{"accounts": ["Assets:Bank"]}')
+    conf = Config.load(str(path))
+    assert conf.accounts == {"Assets:Bank"}
+    costflow = Costflow(conf)
+    conf.accept(costflow.parse("open Assets:Cash"))
+    assert conf.accounts == {"Assets:Bank", "Assets:Cash"}
+    Costflow(Config())
+
+
+class SwapPredictor:
+    "Reload the config in the middle of a parse"
+    def complete(self, trx):
+        config.config = Config(default_currency="USD")
+        trx.postings.append(Posting("visa"))
+        return True
+
+
+def test_reload_during_parse():
+    costflow = Costflow(Config(predictor=SwapPredictor()))
+    trx = costflow.parse("@KFC 10 bofa")
+    # The parse keeps the config it started with
+    assert [p.currency for p in trx.postings] == ["CNY", "CNY"]
+    assert config.config.default_currency == "USD"
+    Costflow(Config())
+
+
+def test_watcher(tmp_path):
+    balances = BalanceIndex()
+    costflow = Costflow(Config(balances=balances))
+    path = tmp_path / "config.json"
+    write(path, {"formulas": {"a": "@A {{ pre }} bofa > visa", "b": "@B {{ pre }} bofa > visa"}}, 1000)
+
+    watcher = ConfigWatcher(str(path))
+    assert watcher.check() == {"a", "b"}
+    assert watcher.check() == set()
+    assert str(costflow.parse("f a 10").narration.payee) == "A"
+
+    write(path, {"formulas": {"a": "@A {{ pre }} bofa > visa", "b": "@C {{ pre }} bofa > visa"}}, 2000)
+    old = config.config
+    assert watcher.check() == {"b"}
+    assert config.config is not old
+    assert config.config.balances is balances
+    assert str(costflow.parse("f b 10").narration.payee) == "C"
+
+    # Broken file keeps the running config
+    path.write_text("{")
+    os.utime(path, (3000, 3000))
+    assert watcher.check() == set()
+    assert watcher.error is not None
+    assert config.config.formulas["b"] == "@C {{ pre }} bofa > visa"
+    Costflow(Config())
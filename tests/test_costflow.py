@@ -1,10 +1,11 @@
-from datetime import datetime
+from datetime import date, datetime
 from decimal import Decimal
 import pytest
-from costflow import Costflow
+from costflow import Costflow, rules
 from costflow.config import Config
 from costflow.definitions import (
-    Comment, Transaction, Narration, Posting, Payee,
+    Comment, Transaction, Narration, Posting, Payee, UnaryEntry,
+    CostflowLimitError, CostflowSyntaxError,
 )
 
 
@@ -61,3 +62,66 @@ def test_parse(today):
         inputs, exp = tc
         got = costflow.parse(inputs)
         assert got == exp
+
+
+def test_intern_strings(monkeypatch):
+    costflow = Costflow(Config(), intern_strings=True)
+    # Build the names at runtime, so the compiler can't share the constants
+    first, second = (costflow.parse("@" + "".join(["Star", "bucks"]) + " 24 USD bofa > coffee") for _ in range(2))
+    assert first.narration.payee.payee is second.narration.payee.payee
+    assert first.postings[0].account is second.postings[0].account
+    assert first.postings[0].currency is second.postings[1].currency
+
+    entries, _ = costflow.parse_journal("2021-01-01 open Assets:Bank\n2021-01-02 close Assets:Bank")
+    assert entries[0].content is entries[1].content
+
+    # Only names are interned, not free text
+    costflow.strings.clear()
+    costflow.parse("@Starbucks latte 24 USD bofa > coffee")
+    assert set(costflow.strings) == {"Starbucks", "USD", "bofa", "coffee"}
+
+    # The table is bounded
+    monkeypatch.setattr(rules, "_INTERN_LIMIT", 3)
+    costflow.parse("balance Assets:Bank 1 USD")
+    assert len(costflow.strings) <= 3
+
+    # Interning is opt-in
+    costflow = Costflow(Config())
+    first, second = (costflow.parse("@Starbucks 24 USD bofa > coffee") for _ in range(2))
+    assert first.postings[0].account is not second.postings[0].account
+    assert costflow.strings is None
+
+
+def test_limits():
+    conf = Config(
+        formulas={"long": "{{ pre }} " + "x " * 50, "many": "@x {{ pre }} a + 1 b + 2 c > d"},
+        max_input_length=50, max_tokens=10,
+    )
+    costflow = Costflow(conf)
+    assert costflow.parse("@Starbucks 24 bofa > coffee").postings[0].account == "bofa"
+
+    testcases = [
+        ("x" * 51, "length"),
+        ("f long 1", "length"),
+        ("@Starbucks 1 a + 2 b + 3 c > coffee", "tokens"),
+        ("many 24", "tokens"),
+    ]
+    for inputs, reason in testcases:
+        with pytest.raises(CostflowLimitError) as e:
+            costflow.parse(inputs)
+        assert e.value.reason == reason
+        assert not isinstance(e.value, CostflowSyntaxError)
+    assert costflow.rejected == {"length": 2, "tokens": 2}
+
+    # An input of exactly `max_tokens` tokens is accepted
+    conf.max_tokens = 3
+    assert costflow.parse("2021-01-01 open Assets:Bank") == UnaryEntry("open", "Assets:Bank", date(2021, 1, 1))
+    with pytest.raises(CostflowLimitError):
+        costflow.parse("2021-01-01 open Assets:Bank x")
+    conf.max_tokens = 10
+
+    conf.time_budget = 1e-9
+    with pytest.raises(CostflowLimitError, match="time budget"):
+        costflow.parse("@Starbucks 24 bofa > coffee")
+    assert costflow.rejected["time"] == 1
+    Costflow(Config())
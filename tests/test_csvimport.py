@@ -0,0 +1,66 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+import pytest
+from costflow import Costflow
+from costflow.config import Config
+from costflow.csvimport import import_csv, render_csv
+from costflow.definitions import Comment, CostflowLimitError
+
+
+STATEMENT = """\
+Date,Description,Memo,Amount
+09/24/2021,McDonald's,Burger,"-1,024.50"
+09/25/2021,Salary,,3000
+"""
+
+
+def test_import_columns():
+    mapping = {
+        "date": "Date", "date_format": "%m/%d/%Y",
+        "payee": "Description", "narration": "Memo", "amount": "Amount",
+        "account": "Assets:BofA", "counter_account": "Expenses:Unknown",
+    }
+    conf = Config(default_currency="USD", csv_mappings={"bofa": mapping})
+    Costflow(conf)
+
+    entries = list(import_csv(StringIO(STATEMENT), "bofa", chunk_size=1))
+    assert len(entries) == 2
+    assert entries[0].narration.date_ == date(2021, 9, 24)
+    assert str(entries[0].narration.payee) == "McDonald's"
+    assert entries[0].narration.desc == "Burger"
+    assert [(p.account, p.amount, p.currency) for p in entries[0].postings] == [
+        ("Assets:BofA", Decimal("-1024.50"), "USD"),
+        ("Expenses:Unknown", Decimal("1024.50"), "USD"),
+    ]
+
+    out = StringIO()
+    assert render_csv(StringIO(STATEMENT), mapping, out) == 2
+    assert out.getvalue().startswith('''\
+2021-09-24 * "McDonald's" "Burger"
+\tAssets:BofA\t-1024.50 USD
+\tExpenses:Unknown\t1024.50 USD
+
+2021-09-25 * "Salary" ""
+''')
+    Costflow(Config())
+
+
+def test_import_formula():
+    mapping = {"formula": "bofa", "inputs": ["Amount", "Description"], "delimiter": ";"}
+    costflow = Costflow(Config(formulas={"bofa": "@{{ pre }} {{ amount }} bofa > food"}))
+    statement = "Description;Amount\nKFC;25\nbad;abc\n"
+    entries = list(import_csv(StringIO(statement), mapping, costflow))
+    assert str(entries[0].narration.payee) == "KFC"
+    assert entries[0].postings[0].amount == Decimal(25)
+    assert entries[1] == Comment("abc bad")
+
+    with pytest.raises(ValueError):
+        next(import_csv(StringIO(statement), mapping))
+
+    # Rendered formulas are limited like parsed inputs
+    costflow = Costflow(Config(formulas={"bofa": "@{{ pre }} {{ amount }} bofa > food"}, max_input_length=10))
+    with pytest.raises(CostflowLimitError):
+        list(import_csv(StringIO("Description;Amount\nKFC;25\n"), mapping, costflow))
+    assert costflow.rejected["length"] == 1
+    Costflow(Config())
@@ -0,0 +1,43 @@
+from datetime import date
+from decimal import Decimal
+from costflow.dedupe import Deduper, fingerprint
+from costflow.definitions import Comment, Narration, Payee, Posting, Transaction
+
+
+def make_trx(day, payee="Verizon", amount="59.61", desc=""):
+    trx = Transaction(
+        narration=Narration(Payee(payee), desc, "*", date(2021, 1, day)),
+        postings=[Posting("Expenses:Phone", Decimal(amount)), Posting("Assets:BofA")],
+    )
+    trx.build()
+    return trx
+
+
+def test_fingerprint():
+    trx = make_trx(1)
+    reordered = make_trx(1)
+    reordered.postings.reverse()
+    assert fingerprint(trx) == fingerprint(reordered)
+    assert fingerprint(trx) == fingerprint(make_trx(1, amount="59.610"))
+    assert fingerprint(trx) != fingerprint(make_trx(2))
+
+
+def test_dedupe():
+    deduper = Deduper()
+    deduper.load([make_trx(1), Comment("hi")])
+    assert deduper.is_duplicate(make_trx(1))
+    assert not deduper.is_duplicate(make_trx(1, payee="AT&T"))
+    assert not deduper.is_duplicate(make_trx(3))
+
+    entries = [make_trx(1), make_trx(2), Comment("hi"), make_trx(2), Comment("hi")]
+    assert list(deduper.filter(entries)) == [make_trx(2), Comment("hi"), Comment("hi")]
+
+
+def test_dedupe_window():
+    deduper = Deduper(window=2)
+    deduper.add(make_trx(10))
+    # Same postings within two days, even if narration differs
+    assert deduper.is_duplicate(make_trx(8, desc="retry"))
+    assert deduper.is_duplicate(make_trx(12))
+    assert not deduper.is_duplicate(make_trx(13))
+    assert not deduper.is_duplicate(make_trx(10, amount="10"))
@@ -0,0 +1,31 @@
+from datetime import date
+from io import StringIO
+from costflow.definitions import Comment, KVEntry, Option, UnaryEntry
+from costflow.export import export_sorted
+
+
+def make_entries():
+    entries = []
+    for i in range(50):
+        entries.append(UnaryEntry("open", f"Assets:Bank{i}", date(2021, 1, 1 + (i * 7) % 28)))
+        entries.append(KVEntry("note", f"Assets:Bank{i}", "multi\nline", date(2021, 1, 1 + (i * 7) % 28)))
+    entries.append(Option("title", "Example"))
+    entries.append(Comment("hello"))
+    return entries
+
+
+def test_export_sorted():
+    in_memory, spilled = StringIO(), StringIO()
+    assert export_sorted(make_entries(), in_memory) == 0
+    assert export_sorted(make_entries(), spilled, memory_budget=1000) > 1
+    assert in_memory.getvalue() == spilled.getvalue()
+
+    blocks = spilled.getvalue().split("\n\n")[:-1]
+    assert len(blocks) == 102
+    assert blocks[:2] == ['option "title" "Example"', "; hello"]
+    dates = [block[:10] for block in blocks[2:]]
+    assert dates == sorted(dates)
+    # Entries on the same day keep their order
+    assert blocks[2] == "2021-01-01 open Assets:Bank0"
+    assert blocks[3] == '2021-01-01 note Assets:Bank0 "multi\nline"'
+    assert blocks[4] == "2021-01-01 open Assets:Bank4"
@@ -0,0 +1,92 @@
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from costflow import Costflow
+from costflow.config import Config
+from costflow.definitions import Balance, Comment, Transaction, UnaryEntry
+from costflow.journal import LineError
+from costflow.workload import Workload
+
+
+def test_parse_journal():
+    costflow = Costflow(Config(formulas={"valid": "{{ pre }} bofa > visa"}))
+    text = "\n".join([
+        "> bad line",
+        "2021-09-24 ! 麦当劳 汉堡",
+        "  | from USD 24 | to1 CNY -18",
+        "| to2 -6",
+        "",
+        "open Assets:Bank",
+        "ytd balance Assets:Bank 10",
+        "f valid @payee 10",
+        "valid @payee 5",
+        "open",
+        "close Assets:Bank",
+    ])
+    entries, errors = costflow.parse_journal(text)
+
+    assert entries[0] == Comment("> bad line")
+    assert isinstance(entries[1], Transaction)
+    assert [p.amount for p in entries[1].postings] == [24, -18, -6]
+    assert entries[2] == UnaryEntry("open", "Assets:Bank")
+    yesterday = datetime.today().date() - timedelta(days=1)
+    assert entries[3] == Balance("Assets:Bank", Decimal(10), "CNY", yesterday)
+    # Formulas and fallbacks
+    assert entries[4].postings[0].amount == Decimal(10)
+    assert entries[5].postings[0].amount == Decimal(5)
+    assert entries[6] == Comment("open")
+    assert entries[7] == UnaryEntry("close", "Assets:Bank")
+    assert len(entries) == 8
+
+    assert [err.lineno for err in errors] == [1, 9, 10]
+    assert errors[0] == LineError(1, "Syntax error at '>'")
+
+
+def test_parse_journal_matches_parse():
+    costflow = Costflow(Config())
+    lines = [
+        "@payee 100 bofa > visa",
+        "2017-01-02 event location Paris, France",
+        "; hello",
+        "option title Example",
+        "2021-01-01 price HOOL 10 USD",
+        "haha haha haha",
+    ]
+    entries, errors = costflow.parse_journal("\n".join(lines))
+    assert errors == [LineError(6, "Syntax error at 'haha'")]
+    assert entries == [costflow.parse(line) for line in lines]
+    assert entries[1].date_ == date(2017, 1, 2)
+
+
+def test_parse_journal_build_errors():
+    costflow = Costflow(Config())
+    lines = [
+        "2021-01-01 open Assets:Bank",
+        "balance Assets:A",
+        "2021-01-01 open assets:bad",
+        "@Verizon 59.61 Assets:bad > phone",
+        "close Assets:Bank",
+    ]
+    entries, errors = costflow.parse_journal("\n".join(lines))
+    assert [err.lineno for err in errors] == [2, 3, 4]
+    assert errors[1] == LineError(3, "Invalid account: assets:bad")
+    assert entries == [costflow.parse(line) for line in lines]
+    assert entries[1:4] == [Comment(line) for line in lines[1:4]]
+
+
+def test_parse_journal_recovery():
+    costflow = Costflow(Config())
+    # Comment marks at the end, and bad lines followed by blank lines
+    for text in ["@KFC 10 bofa > food\n; ", "open Assets:A\n//", "balance -5 ;",
+                 "haha haha\n\n@KFC 10 bofa > food", 'y" \n "x // \n\n y" f']:
+        entries, errors = costflow.parse_journal(text)
+        assert entries == [costflow.parse(line) for line in text.split("\n") if line.strip()]
+        assert errors
+    entries, errors = costflow.parse_journal("haha haha\n\n@KFC 10 bofa > food")
+    assert entries[0].render() == "; haha haha"
+
+    workload = Workload(seed=1)
+    costflow = Costflow(workload.config())
+    lines = list(workload.lines(1000))
+    entries, errors = costflow.parse_journal("\n\n".join(lines))
+    assert entries == [costflow.parse(line) for line in lines]
+    Costflow(Config())
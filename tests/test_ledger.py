@@ -0,0 +1,139 @@
+import json
+import zlib
+from datetime import date
+import pytest
+from costflow.definitions import Comment, KVEntry, Option, UnaryEntry
+from costflow.ledger import LedgerIndex
+from costflow.writer import LedgerWriter
+
+
+LEDGER = """\
+option "title" "Example"
+
+2021-01-01 open Assets:Bank
+
+2021-02-01 * "Payee" "Desc"
+\tAssets:Bank\t10.00 CNY
+\tExpenses:Food\t-10.00 CNY
+
+2021-03-01 close Assets:Bank"""
+
+
+def test_insert(tmp_path):
+    path = tmp_path / "main.bean"
+    path.write_text(LEDGER)
+    index_path = str(tmp_path / "main.idx")
+    index = LedgerIndex(str(path), index_path)
+    assert len(index.dates) == 3
+
+    middle = Comment("in the middle")
+    middle.date_ = date(2021, 1, 20)
+    index.insert([
+        KVEntry("note", "Assets:Bank", "last", date(2021, 4, 1)),
+        UnaryEntry("open", "Expenses:Food", date(2021, 1, 15)),
+        KVEntry("note", "Assets:Bank", "first", date(2020, 1, 1)),
+        UnaryEntry("open", "Expenses:Home", date(2021, 1, 15)),
+        UnaryEntry("close", "Expenses:Home", date(2021, 2, 1)),
+        Comment("undated"),
+        middle,
+    ])
+    lines = [line for line in path.read_text().split("\n") if line and not line.startswith("\t")]
+    assert lines[1:] == [
+        '2020-01-01 note Assets:Bank "first"',
+        "2021-01-01 open Assets:Bank",
+        "2021-01-15 open Expenses:Food",
+        "2021-01-15 open Expenses:Home",
+        "; in the middle",
+        '2021-02-01 * "Payee" "Desc"',
+        "2021-02-01 close Expenses:Home",
+        "2021-03-01 close Assets:Bank",
+        '2021-04-01 note Assets:Bank "last"',
+        "; undated",
+    ]
+
+    # The index is updated incrementally, and is identical to a rebuilt one
+    rebuilt = LedgerIndex(str(path))
+    assert index.dates == rebuilt.dates
+    assert index.offsets == rebuilt.offsets
+    assert index.size == rebuilt.size
+
+    # The saved index is reused as long as the ledger is unchanged
+    loaded = LedgerIndex(str(path), index_path)
+    assert loaded.offsets == rebuilt.offsets
+    path.write_text(LEDGER)
+    assert LedgerIndex(str(path), index_path).size == len(LEDGER)
+
+
+def test_insert_into_empty(tmp_path):
+    path = tmp_path / "main.bean"
+    path.write_text("")
+    index = LedgerIndex(str(path))
+    index.insert([Option("title", "Example"), UnaryEntry("open", "Assets:Bank", date(2021, 1, 1))])
+    assert path.read_text() == '2021-01-01 open Assets:Bank\n\noption "title" "Example"\n\n'
+    assert list(index.offsets) == [0]
+
+
+def test_insert_after_append(tmp_path):
+    path = tmp_path / "main.bean"
+    path.write_text(LEDGER + "\n\n")
+    index_path = str(tmp_path / "main.idx")
+    index = LedgerIndex(str(path), index_path)
+
+    # Another writer appends after the file is indexed
+    with LedgerWriter(str(path)) as writer:
+        writer.write(UnaryEntry("open", "Expenses:Home", date(2021, 5, 1)))
+    index.insert([KVEntry("note", "Assets:Bank", "april", date(2021, 4, 1))])
+
+    assert path.read_text().endswith(
+        '2021-03-01 close Assets:Bank\n\n2021-04-01 note Assets:Bank "april"\n\n2021-05-01 open Expenses:Home\n\n'
+    )
+    rebuilt = LedgerIndex(str(path))
+    assert len(index.offsets) == 5
+    assert index.offsets == rebuilt.offsets
+    assert LedgerIndex(str(path), index_path).offsets == rebuilt.offsets
+    assert not (tmp_path / "main.bean.redo").exists()
+
+
+def test_refresh_appended(tmp_path, monkeypatch):
+    path = tmp_path / "main.bean"
+    path.write_text(LEDGER)
+    index = LedgerIndex(str(path))
+
+    # Appended bytes are indexed without scanning the file again
+    def build():
+        raise AssertionError("scanned")
+    monkeypatch.setattr(index, "build", build)
+    with path.open("a") as f:
+        f.write("\n\n2021-04-01 open Expenses:Home\n")
+    index.refresh()
+    rebuilt = LedgerIndex(str(path))
+    assert index.offsets == rebuilt.offsets
+    assert index.dates == rebuilt.dates
+
+    # A rewrite is detected by the last indexed bytes
+    path.write_text(LEDGER.replace("2021-03-01", "2021-03-02") + "\n\n" + " " * 10)
+    with pytest.raises(AssertionError):
+        index.refresh()
+
+
+def test_replay(tmp_path):
+    path = tmp_path / "main.bean"
+    start = LEDGER.index("2021-03-01")
+    tail = b'2021-02-15 note Assets:Bank "inserted"\n\n' + LEDGER[start:].encode() + b"\n\n"
+    header = json.dumps({"start": start, "length": len(tail), "crc": zlib.crc32(tail)}).encode() + b"\n"
+
+    # A crash in the middle of the splice
+    path.write_text(LEDGER[:start] + "2021-02-15 no")
+    redo = tmp_path / "main.bean.redo"
+    redo.write_bytes(header + tail)
+    index = LedgerIndex(str(path))
+    assert path.read_bytes() == LEDGER[:start].encode() + tail
+    assert len(index.dates) == 4
+    assert not redo.exists()
+
+    # A journal cut short is dropped, the ledger was not touched yet
+    redo.write_bytes(header + tail[:5])
+    with LedgerWriter(str(path)) as writer:
+        writer.write(Comment("appended"))
+    assert path.read_bytes() == LEDGER[:start].encode() + tail + b"; appended\n\n"
+    assert not redo.exists()
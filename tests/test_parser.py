@@ -4,7 +4,7 @@ from datetime import date, datetime, timedelta
 from ply import lex, yacc
 from costflow import rules
 from costflow.definitions import (
-    Balance, KVEntry, Option, Pad, Transaction,
+    Balance, KVEntry, Option, Pad, Price, Transaction,
     Payee, Narration, Posting, Comment, UnaryEntry
 )
 
@@ -190,6 +190,11 @@ def test_event_and_note(parser, lexer):
         assert res == tc[1]
         parser.restart()
 
+    # Directives are whole words, a payee may start with one
+    res = parser.parse("@notebook 10 bofa > x", lexer=lexer.clone())
+    assert isinstance(res, Transaction)
+    assert res.narration.payee == Payee("notebook")
+
 
 def test_balance(parser, lexer):
     testcases = (
@@ -202,6 +207,19 @@ def test_balance(parser, lexer):
         parser.restart()
 
 
+def test_price(parser, lexer):
+    testcases = (
+        ('2014-07-09 price HOOL 579.18 USD', Price("HOOL", Decimal("579.18"), "USD", date(2014, 7, 9))),
+        ("price USD 6.45", Price("USD", Decimal("6.45"), "CNY")),
+        # Directives are matched as whole words
+        ("@priceline", Narration(Payee("priceline"), "")),
+    )
+    for tc in testcases:
+        res = parser.parse(tc[0], lexer=lexer.clone())
+        assert res == tc[1]
+        parser.restart()
+
+
 def test_pad(parser, lexer):
     testcases = (
         ('2017-01-01 pad bofa eob', Pad("bofa", "eob", date(2017, 1, 1))),
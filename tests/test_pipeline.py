@@ -0,0 +1,82 @@
+import itertools
+import pytest
+from datetime import date
+from costflow import config
+from costflow.balances import BalanceIndex
+from costflow.config import Config
+from costflow.dedupe import Deduper
+from costflow.pipeline import Pipeline, Stage, import_stages
+from costflow.writer import LedgerWriter
+
+
+def test_pipeline():
+    def fail(i):
+        if i == 6:
+            raise ValueError("six")
+        return i
+
+    pipeline = Pipeline([
+        Stage("double", lambda i: i * 2, workers=4, queue_size=2),
+        Stage("odd", lambda i: i if i % 4 else None),
+        Stage("fail", fail),
+    ])
+    assert sorted(pipeline.run(range(10))) == [2, 10, 14, 18]
+
+    stats = pipeline.stats()
+    assert stats["double"].processed == 10
+    assert stats["odd"].dropped == 5
+    assert stats["fail"].dropped == 1
+    assert stats["double"].max_queue_depth <= 2
+    assert [(name, item) for name, item, _ in pipeline.errors] == [("fail", 6)]
+
+
+def test_pipeline_stop():
+    pipeline = Pipeline([Stage("same", lambda i: i, queue_size=1)], output_size=1)
+    # The consumer stops early, while the feeder is blocked on full queues
+    for i in pipeline.run(itertools.count()):
+        if i == 3:
+            break
+
+    def items():
+        yield 1
+        yield 2
+        raise ValueError("broken input")
+
+    got = []
+    with pytest.raises(ValueError, match="broken input"):
+        for i in Pipeline([Stage("same", lambda i: i)]).run(items()):
+            got.append(i)
+    assert got == [1, 2]
+
+
+def test_import_stages(tmp_path):
+    global_conf = config.config
+    path = str(tmp_path / "main.bean")
+    lines = [
+        "2021-01-01 Starbucks 24 bofa > coffee",
+        "",
+        "2021-01-01 Starbucks 24 bofa > coffee",
+        "2021-01-02 open Assets:Bank",
+    ]
+    balances = BalanceIndex()
+    with LedgerWriter(path) as writer:
+        pipeline = Pipeline(import_stages(Config(balances=balances), deduper=Deduper(), writer=writer))
+        rendered = list(pipeline.run(lines))
+    # The duplicate is not counted
+    assert balances.balance("bofa", "CNY", date(2021, 1, 2)) == 24
+    assert sorted(rendered) == [
+        '2021-01-01 * "" "Starbucks"\n\tbofa\t24.00 CNY\n\tcoffee\t-24.00 CNY',
+        "2021-01-02 open Assets:Bank",
+    ]
+    assert pipeline.stats()["dedupe"].dropped == 1
+    with open(path) as f:
+        assert sorted(f.read().split("\n\n")[:2]) == sorted(rendered)
+    # Building and running the stages leaves the global config alone
+    assert config.config is global_conf
+
+
+def test_import_stages_processes():
+    pipeline = Pipeline(import_stages(parse_processes=2))
+    rendered = list(pipeline.run(["2021-01-02 price BTC 40000 USD", "haha"] * 3))
+    assert sorted(rendered) == ["2021-01-02 price BTC 40000 USD"] * 3 + ["; haha"] * 3
+    assert pipeline.stats()["parse"].processed == 6
@@ -0,0 +1,80 @@
+from datetime import date
+from decimal import Decimal
+import pytest
+from costflow import Costflow
+from costflow.config import Config
+from costflow.definitions import Comment, Narration, Payee, Posting, Transaction
+from costflow.predict import PostingPredictor
+
+
+def make_trx(payee, desc, *accounts):
+    return Transaction(
+        narration=Narration(Payee(payee), desc, "*", date(2021, 1, 1)),
+        postings=[Posting(account, Decimal(1), "USD") for account in accounts],
+    )
+
+
+@pytest.fixture
+def predictor():
+    predictor = PostingPredictor()
+    predictor.load([
+        make_trx("Verizon", "phone bill", "Assets:BofA", "Expenses:Phone"),
+        make_trx("Verizon", "phone bill", "Assets:BofA", "Expenses:Phone"),
+        make_trx("Verizon", "", "Liabilities:Visa", "Expenses:Phone"),
+        make_trx("Vanguard", "", "Assets:BofA", "Assets:Vanguard"),
+        make_trx("", "Dinner", "Liabilities:Visa", "Expenses:Food"),
+        Comment("hello"),
+    ])
+    return predictor
+
+
+def test_predict(predictor):
+    assert predictor.predict("Verizon") == [
+        ("Assets:BofA", "Expenses:Phone"),
+        ("Liabilities:Visa", "Expenses:Phone"),
+    ]
+    assert predictor.predict("KFC", "dinner with friends") == [("Liabilities:Visa", "Expenses:Food")]
+    assert predictor.predict("KFC") == []
+
+
+def test_complete(predictor):
+    trx = Transaction(Narration(Payee("Verizon"), ""), [Posting(None, Decimal(10))])
+    assert predictor.complete(trx)
+    assert [p.account for p in trx.postings] == ["Assets:BofA", "Expenses:Phone"]
+
+    # Known accounts narrow down the prediction
+    trx = Transaction(Narration(Payee("Verizon"), ""), [Posting("Liabilities:Visa", Decimal(10))])
+    assert predictor.complete(trx)
+    assert [p.account for p in trx.postings] == ["Liabilities:Visa", "Expenses:Phone"]
+
+    trx = Transaction(Narration(Payee("KFC"), ""), [Posting(None, Decimal(10))])
+    assert not predictor.complete(trx)
+
+
+def test_suggest(predictor):
+    assert predictor.suggest_payees("V") == ["Verizon", "Vanguard"]
+    assert predictor.suggest_payees("Van") == ["Vanguard"]
+    assert predictor.suggest_accounts("Assets:", limit=1) == ["Assets:BofA"]
+    assert predictor.suggest_accounts("Income") == []
+
+
+def test_save_and_load(predictor, tmp_path):
+    path = str(tmp_path / "predictor.json")
+    predictor.save(path)
+    loaded = PostingPredictor()
+    loaded.load_file(path)
+    assert loaded.payees == predictor.payees
+    assert loaded.tokens == predictor.tokens
+    assert loaded.suggest_accounts("") == predictor.suggest_accounts("")
+
+
+def test_parse_with_prediction(predictor):
+    costflow = Costflow(Config(predictor=predictor))
+    trx = costflow.parse("@Verizon 59.61")
+    assert trx.postings == [
+        Posting("Assets:BofA", Decimal("59.61"), "CNY"),
+        Posting("Expenses:Phone", Decimal("-59.61"), "CNY"),
+    ]
+
+    costflow = Costflow(Config())
+    assert costflow.parse("@Verizon 59.61") == Comment("@Verizon 59.61")
@@ -0,0 +1,34 @@
+from datetime import date
+from decimal import Decimal
+from costflow.definitions import Comment, Posting, Price
+from costflow.prices import PriceIndex
+
+
+def test_price_index():
+    index = PriceIndex()
+    index.load([
+        Price("USD", Decimal("6.5"), "CNY", date(2021, 1, 1)),
+        Price("USD", Decimal("6.4"), "CNY", date(2021, 3, 1)),
+        # Out of order
+        Price("USD", Decimal("6.45"), "CNY", date(2021, 2, 1)),
+        Price("CNY", Decimal("16"), "JPY", date(2021, 1, 1)),
+        Comment("not a price"),
+    ])
+    assert index.get_rate("USD", "CNY", date(2020, 12, 31)) is None
+    assert index.get_rate("USD", "CNY", date(2021, 1, 1)) == Decimal("6.5")
+    assert index.get_rate("USD", "CNY", date(2021, 2, 15)) == Decimal("6.45")
+    assert index.get_rate("USD", "CNY", date(2022, 1, 1)) == Decimal("6.4")
+    assert index.get_rate("CNY", "CNY", date(2000, 1, 1)) == 1
+    # Inverse pair
+    assert index.get_rate("JPY", "CNY", date(2021, 1, 1)) == 1 / Decimal(16)
+    assert index.get_rate("EUR", "CNY", date(2021, 1, 1)) is None
+
+
+def test_convert():
+    index = PriceIndex()
+    index.add(Price("USD", Decimal("6.5"), "CNY", date(2021, 1, 1)))
+    assert index.convert(Decimal(10), "USD", date(2021, 5, 1)) == Decimal(65)
+    assert index.convert(Decimal(10), "EUR", date(2021, 5, 1)) is None
+    posting = Posting("Assets:BofA", Decimal(2), "USD")
+    assert index.convert_posting(posting, date(2021, 1, 2)) == Decimal(13)
+    assert index.convert_posting(posting, date(2021, 1, 2), "USD") == Decimal(2)
@@ -0,0 +1,87 @@
+from decimal import Decimal
+from multiprocessing import pool
+import pytest
+from costflow import config
+from costflow.config import Config
+from costflow.definitions import Comment, Transaction, UnaryEntry
+from costflow.reader import LineIndex, parse_file
+
+
+LINES = [
+    "@payee 100 bofa > visa",
+    "",
+    "open Assets:Bank",
+    "f valid @payee 10",
+    "haha haha haha haha",
+    "2021-01-01 close Assets:Bank",
+]
+
+
+@pytest.fixture
+def inputs(tmp_path):
+    path = tmp_path / "inputs.txt"
+    path.write_text("\r\n".join(LINES) + "\r\n", encoding="utf-8")
+    return str(path)
+
+
+@pytest.fixture
+def conf():
+    return Config(formulas={"valid": "{{ pre }} bofa > visa"})
+
+
+def test_line_index(inputs, tmp_path):
+    with LineIndex(inputs) as index:
+        assert len(index) == len(LINES)
+        assert index.line(2) == "open Assets:Bank"
+        assert list(index.lines(4)) == [(4, LINES[4]), (5, LINES[5])]
+        assert index.split(4) == [(0, 4), (4, 6)]
+
+    path = tmp_path / "empty.txt"
+    path.write_text("")
+    with LineIndex(str(path)) as index:
+        assert len(index) == 0
+        assert list(index.lines()) == []
+
+
+def check_results(results):
+    assert [lineno for lineno, _ in results] == [0, 2, 3, 4, 5]
+    assert isinstance(results[0][1], Transaction)
+    assert results[1][1] == UnaryEntry("open", "Assets:Bank")
+    assert results[2][1].postings[0].amount == Decimal(10)
+    assert results[3][1] == Comment("haha haha haha haha")
+
+
+def test_parse_file(inputs, conf):
+    global_conf = config.config
+    check_results(list(parse_file(inputs, conf, chunk_size=2)))
+    check_results(list(parse_file(inputs, conf, processes=2, chunk_size=2)))
+    # The config is only used by the parse
+    assert config.config is global_conf
+
+
+def test_parse_file_window(inputs, conf, monkeypatch):
+    submitted = []
+    apply_async = pool.Pool.apply_async
+
+    def submit(self, func, args):
+        submitted.append(args)
+        return apply_async(self, func, args)
+    monkeypatch.setattr(pool.Pool, "apply_async", submit)
+
+    results = parse_file(inputs, conf, processes=1, chunk_size=1)
+    assert next(results)[0] == 0
+    # Chunks are submitted as results are consumed, instead of all at once
+    assert len(submitted) == 2
+    assert [lineno for lineno, _ in results] == [2, 3, 4, 5]
+    assert len(submitted) == 6
+
+
+def test_parse_file_resume(inputs, conf, tmp_path):
+    checkpoint = str(tmp_path / "checkpoint")
+    results = parse_file(inputs, conf, chunk_size=3, checkpoint=checkpoint)
+    # "Crash" after consuming the first chunk
+    assert [next(results)[0] for _ in range(3)] == [0, 2, 3]
+    results.close()
+
+    resumed = list(parse_file(inputs, conf, chunk_size=3, checkpoint=checkpoint))
+    assert [lineno for lineno, _ in resumed] == [3, 4, 5]
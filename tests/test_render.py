@@ -3,7 +3,7 @@ from decimal import Decimal
 import pytest
 from costflow.definitions import (
     Comment, Narration, Transaction, Posting, Balance,
-    Pad, Option, KVEntry, UnaryEntry,
+    Pad, Option, KVEntry, UnaryEntry, Price,
 )
 
 
@@ -153,3 +153,14 @@ def test_pad(today):
     )
     for tc in testcases:
         assert tc[0].render() == tc[1]
+
+
+def test_price(today):
+    testcases = (
+        (Price("HOOL", Decimal("579.18"), "USD", date(2014, 7, 9)),
+         "2014-07-09 price HOOL 579.18 USD"),
+        (Price("USD", Decimal("6.45")),
+         f"{today} price USD 6.45 CNY"),
+    )
+    for tc in testcases:
+        assert tc[0].render() == tc[1]
@@ -0,0 +1,65 @@
+from datetime import date
+from decimal import Decimal
+from io import StringIO
+from costflow import serialize
+from costflow.definitions import (
+    Balance, Comment, Entry, KVEntry, Narration, Option, Pad,
+    Payee, Posting, Price, Transaction, UnaryEntry,
+)
+
+
+def make_entries():
+    return [
+        Transaction(
+            narration=Narration(Payee("麦当劳"), "汉堡", "!", date(2021, 9, 24)),
+            postings=[
+                Posting("from", Decimal("24.10"), "USD"),
+                Posting("to1", Decimal(-18), "CNY"),
+                Posting("to2"),
+            ]
+        ),
+        Balance("Assets:BofA", Decimal("360.00"), "USD", date(2017, 1, 1)),
+        Pad("bofa", "eob"),
+        Price("HOOL", Decimal("579.18"), "USD", date(2014, 7, 9)),
+        KVEntry("note", "bofa", "Called about fraudulent card.", date(2019, 7, 1)),
+        Option("title", "Example Costflow file"),
+        UnaryEntry("open", "Assets:Bank"),
+        Comment("hello\nbeancount"),
+    ]
+
+
+def test_dict_round_trip():
+    for entry in make_entries():
+        data = entry.to_dict()
+        assert data["type"] == type(entry).__name__
+        assert Entry.from_dict(data) == entry
+        assert type(entry).from_dict(data) == entry
+        assert Entry.from_dict(entry.to_dict(compact=True)) == entry
+
+
+def test_value_encoding():
+    data = Balance("Assets:BofA", Decimal("1.10"), "USD", date(2017, 1, 1)).to_dict()
+    assert data == {
+        "type": "Balance",
+        "account": "Assets:BofA",
+        "amount": "1.10",
+        "currency": "USD",
+        "date_": date(2017, 1, 1).toordinal(),
+    }
+
+
+def test_codec():
+    entries = make_entries()
+    text = serialize.dumps(entries)
+    # A batch is a single line
+    assert len(text.splitlines()) == 1
+    assert serialize.loads(text) == entries
+    assert serialize.loads(text + serialize.dumps(entries[:1])) == entries + entries[:1]
+    assert serialize.loads(serialize.dumps(entries[1:2] * 3)) == entries[1:2] * 3
+    assert serialize.dumps([]) == ""
+    assert serialize.loads("") == []
+
+    buf = StringIO()
+    serialize.dump(entries, buf)
+    buf.seek(0)
+    assert list(serialize.load(buf)) == entries
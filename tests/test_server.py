@@ -0,0 +1,88 @@
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from urllib.error import HTTPError
+from urllib.request import urlopen
+import pytest
+from costflow.config import Config
+from costflow.costflow import Costflow
+from costflow.server import make_server, warm
+
+
+def post(url, data):
+    try:
+        with urlopen(url, json.dumps(data).encode()) as resp:
+            return resp.status, json.load(resp)
+    except HTTPError as e:
+        return e.code, json.load(e)
+
+
+@pytest.fixture
+def server():
+    conf = Config(formulas={"coffee": "@Starbucks {{ amount }} bofa > coffee"}, max_input_length=100)
+    server = make_server(("127.0.0.1", 0), warm(conf), quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield "http://127.0.0.1:%d" % server.server_address[1]
+    server.shutdown()
+    server.server_close()
+    Costflow(Config())
+
+
+def test_parse(server):
+    status, data = post(f"{server}/parse", {"text": "2021-01-01 open Assets:Bank"})
+    assert status == 200
+    assert data == {
+        "rendered": "2021-01-01 open Assets:Bank",
+        "entry": {"type": "UnaryEntry", "directive": "open", "content": "Assets:Bank", "date_": 737791},
+    }
+
+    status, data = post(f"{server}/parse_many", {"lines": ["f coffee 24", "", "haha"]})
+    assert status == 200
+    assert data["entries"][0]["rendered"].split("\n")[1:] == ["\tbofa\t24.00 CNY", "\tcoffee\t-24.00 CNY"]
+    assert data["entries"][1:] == [None, {"rendered": "; haha", "entry": {"type": "Comment", "content": "haha"}}]
+
+    assert post(f"{server}/parse", {"text": "x" * 101})[0] == 413
+    assert post(f"{server}/parse", {"lines": []})[0] == 400
+    assert post(f"{server}/parse", {"text": "   "})[0] == 400
+    assert post(f"{server}/unknown", {})[0] == 404
+
+
+def test_prefork(tmp_path):
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ledger = tmp_path / "ledger.txt"
+    ledger.write_text("2021-01-01 @Starbucks 24 bofa > coffee\n")
+
+    env = dict(os.environ, PYTHONPATH=os.getcwd())
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "costflow.server", "--port", str(port), "--workers", "2", "--quiet",
+         "--ledger", str(ledger)],
+        env=env,
+    )
+    try:
+        for _ in range(100):
+            try:
+                status, data = post(f"http://127.0.0.1:{port}/parse", {"text": "@Starbucks 10"})
+                break
+            except OSError:
+                time.sleep(0.05)
+        # Accounts are predicted from the ledger loaded by the parent
+        assert status == 200
+        assert [p["account"] for p in data["entry"]["postings"]] == ["bofa", "coffee"]
+    finally:
+        proc.terminate()
+        assert proc.wait(timeout=10) == 0
+
+
+def test_internal_error(server, monkeypatch):
+    def broken(self, text):
+        raise RuntimeError("broken")
+
+    monkeypatch.setattr(Costflow, "parse", broken)
+    assert post(f"{server}/parse", {"text": "haha"}) == (500, {"error": "Internal error"})
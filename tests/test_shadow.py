@@ -0,0 +1,34 @@
+from costflow.config import Config
+from costflow.costflow import Costflow
+from costflow.definitions import Comment
+from costflow.shadow import ShadowRunner
+
+
+def test_shadow():
+    costflow = Costflow(Config())
+    reference = Costflow(Config())
+
+    def candidate(inputs):
+        if "haha" in inputs:
+            raise ValueError("haha")
+        if "coffee" in inputs:
+            return Comment(inputs)
+        return reference.parse_raw(inputs)
+
+    costflow.shadow = ShadowRunner(candidate, sample_rate=1, max_mismatches=1)
+    lines = ["2021-01-01 open Assets:Bank", "@Starbucks 24 bofa > coffee", "haha"]
+    results = [costflow.parse(line) for line in lines]
+    # Results are never changed by the candidate
+    assert results == [reference.parse(line) for line in lines]
+
+    shadow = costflow.shadow
+    assert shadow.samples == 3
+    assert shadow.errors == 1
+    assert shadow.mismatch_count == 2
+    assert [m.inputs for m in shadow.mismatches] == ["@Starbucks 24 bofa > coffee"]
+    assert shadow.mismatches[0].got == Comment("@Starbucks 24 bofa > coffee")
+    assert shadow.speed_ratio > 0
+
+    costflow.shadow = ShadowRunner(candidate, sample_rate=0)
+    costflow.parse("haha")
+    assert costflow.shadow.samples == 0
@@ -0,0 +1,53 @@
+from costflow.config import Config
+from costflow.costflow import Costflow
+from costflow.definitions import Comment, Transaction, UnaryEntry
+from costflow.utils import check_account
+
+
+def test_check_account():
+    testcases = [
+        ("Assets:Bank", True),
+        ("Assets:US:BofA:Checking", True),
+        ("Liabilities:Credit-Card:2021", True),
+        ("Expenses:餐饮:午餐", True),
+        ("Income:Éditions", True),
+        ("Assets", False),
+        ("Assets:", False),
+        ("assets:Bank", False),
+        ("Asset:Bank", False),
+        ("Assets:bank", False),
+        ("Assets:éditions", False),
+        ("Assets:Bank_Account", False),
+        ("Assets:Bank::Checking", False),
+    ]
+    for account, exp in testcases:
+        assert check_account(account) is exp, account
+
+    known = {"Assets:Bank"}
+    assert check_account("Assets:Bank", known)
+    assert not check_account("Assets:Cash", known)
+
+
+def test_build_accounts():
+    known = {"Assets:Bank"}
+    conf = Config(accounts=known)
+    costflow = Costflow(conf)
+
+    assert isinstance(costflow.parse("@Starbucks 24 Assets:Bank > coffee"), Transaction)
+    # Unknown and invalid accounts fall back to comment
+    assert costflow.parse("@Starbucks 24 Assets:Cash > coffee") == Comment("@Starbucks 24 Assets:Cash > coffee")
+    assert costflow.parse("open assets:cash") == Comment("open assets:cash")
+    assert costflow.parse("close Assets:Cash") == Comment("close Assets:Cash")
+
+    # Building is free of side effects, an account is known once its open is accepted
+    entry = costflow.parse("open Assets:Cash")
+    assert entry == UnaryEntry("open", "Assets:Cash")
+    assert known == {"Assets:Bank"}
+    conf.accept(entry)
+    assert known == {"Assets:Bank", "Assets:Cash"}
+    assert isinstance(costflow.parse("@Starbucks 24 Assets:Cash > coffee"), Transaction)
+    entry = costflow.parse("close Assets:Cash")
+    assert entry == UnaryEntry("close", "Assets:Cash")
+    conf.accept(entry)
+    assert known == {"Assets:Bank"}
+    Costflow(Config())
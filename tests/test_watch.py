@@ -0,0 +1,78 @@
+from costflow import Costflow
+from costflow.definitions import Comment, UnaryEntry
+from costflow.watch import IncrementalParser
+
+
+class CountingCostflow(Costflow):
+    def __init__(self):
+        super().__init__()
+        self.parsed = []
+
+    def parse(self, inputs):
+        self.parsed.append(inputs)
+        return super().parse(inputs)
+
+
+def test_incremental_update(tmp_path):
+    costflow = CountingCostflow()
+    parser = IncrementalParser(costflow)
+
+    delta = parser.update(["open Assets:A", "", "; hello", "; hello"])
+    assert [lineno for lineno, _ in delta.added] == [0, 2, 3]
+    assert delta.changed == delta.removed == []
+
+    costflow.parsed.clear()
+    delta = parser.update(["open Assets:A", "", "; hello", "; world"])
+    assert costflow.parsed == ["; world"]
+    assert delta.changed == [(3, Comment("world"))]
+    assert delta.added == delta.removed == []
+
+    costflow.parsed.clear()
+    delta = parser.update(["open Assets:B", "open Assets:A", "", "; hello", "; world"])
+    # Only new lines are parsed, moved lines are kept
+    assert costflow.parsed == ["open Assets:B"]
+    assert delta.added == [(0, UnaryEntry("open", "Assets:B"))]
+    assert delta.changed == delta.removed == []
+
+    delta = parser.update(["open Assets:B", "; world"])
+    assert not delta.added and not delta.changed
+    assert delta.removed == [(1, UnaryEntry("open", "Assets:A")), (3, Comment("hello"))]
+    assert not parser.update(["open Assets:B", "; world"])
+
+    # Resume from saved state
+    state = str(tmp_path / "state.jsonl")
+    parser.save(state)
+    costflow.parsed.clear()
+    resumed = IncrementalParser(costflow)
+    resumed.load(state)
+    delta = resumed.update(["open Assets:B", "; world", "; new"])
+    assert costflow.parsed == ["; new"]
+    assert delta.added == [(2, Comment("new"))]
+
+
+def test_update_file_append(tmp_path):
+    costflow = CountingCostflow()
+    parser = IncrementalParser(costflow)
+    path = tmp_path / "inbox.txt"
+    path.write_text("open Assets:A\n; hello\n; wor")
+    assert [lineno for lineno, _ in parser.update_file(str(path)).added] == [0, 1, 2]
+
+    # Appended bytes are diffed alone, the unfinished last line is parsed again
+    costflow.parsed.clear()
+    with path.open("a") as f:
+        f.write("ld\n; hello\n")
+    delta = parser.update_file(str(path))
+    assert costflow.parsed == ["; world", "; hello"]
+    assert delta.changed == [(2, Comment("world"))]
+    assert delta.added == [(3, Comment("hello"))]
+    assert parser._lines == 4
+
+    # An edit before the appended bytes is diffed over the whole file
+    costflow.parsed.clear()
+    path.write_text("open Assets:B\n; hello\n; world\n; hello\n")
+    delta = parser.update_file(str(path))
+    assert costflow.parsed == ["open Assets:B"]
+    assert delta.changed == [(0, UnaryEntry("open", "Assets:B"))]
+    fresh = IncrementalParser(costflow)
+    fresh.update_file(str(path))
+    assert parser.entries == fresh.entries
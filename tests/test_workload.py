@@ -0,0 +1,36 @@
+from collections import Counter
+from costflow.config import Config
+from costflow.costflow import Costflow
+from costflow.definitions import (
+    Balance, Comment, KVEntry, Option, Pad, Price, Transaction, UnaryEntry,
+)
+from costflow.workload import DEFAULT_MIX, Workload
+
+
+def test_workload():
+    workload = Workload(seed=42, accounts=50)
+    assert list(workload.lines(100)) == list(Workload(seed=42, accounts=50).lines(100))
+    assert list(workload.lines(100)) != list(Workload(seed=43, accounts=50).lines(100))
+
+    expected = {
+        "transaction": Transaction, "split": Transaction, "pipe": Transaction,
+        "formula": Transaction, "formula_fallback": Transaction,
+        "open": UnaryEntry, "close": UnaryEntry, "commodity": UnaryEntry,
+        "balance": Balance, "pad": Pad, "price": Price,
+        "note": KVEntry, "event": KVEntry, "option": Option,
+        "comment": Comment, "fallback": Comment,
+    }
+    costflow = Costflow(workload.config())
+    kinds = Counter()
+    for kind, line in workload.kinds(3000):
+        assert isinstance(costflow.parse(line), expected[kind]), line
+        kinds[kind] += 1
+    assert kinds.keys() == DEFAULT_MIX.keys()
+    Costflow(Config())
+
+
+def test_workload_mix():
+    workload = Workload(mix={"open": 1}, accounts=3)
+    lines = list(workload.lines(20))
+    assert len(lines) == 20
+    assert {line.split()[-1] for line in lines} <= set(workload.accounts)
@@ -0,0 +1,64 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+import pytest
+from costflow.definitions import Comment, UnaryEntry
+from costflow.writer import FileLock, LedgerWriter
+
+
+class BrokenEntry(Comment):
+    def render(self):
+        raise ValueError("broken")
+
+
+def test_group_commit(tmp_path):
+    path = str(tmp_path / "main.bean")
+    acked = []
+    with LedgerWriter(path, max_batch=50, max_delay=0.05) as writer:
+        with ThreadPoolExecutor(8) as pool:
+            futures = list(pool.map(
+                lambda i: writer.submit(Comment(f"entry {i}"), callback=acked.append),
+                range(200),
+            ))
+        for future in futures:
+            assert future.result(timeout=5) is None
+        writer.write(UnaryEntry("open", "Assets:Bank", date(2021, 1, 1)))
+
+        broken = writer.submit(BrokenEntry("x"))
+        with pytest.raises(ValueError):
+            broken.result(timeout=5)
+        # An entry which cannot be encoded fails alone, and the writer keeps running
+        with pytest.raises(UnicodeEncodeError):
+            writer.write(Comment("\ud800"))
+
+    with open(path) as f:
+        lines = f.read().split("\n\n")
+    assert sorted(lines[:200]) == sorted(f"; entry {i}" for i in range(200))
+    assert lines[200] == "2021-01-01 open Assets:Bank"
+    assert len(acked) == 200
+    # Entries are committed in batches rather than one by one
+    assert writer.batches < 200
+
+
+def test_submit_after_close(tmp_path):
+    writer = LedgerWriter(str(tmp_path / "main.bean"))
+    writer.close()
+    with pytest.raises(RuntimeError):
+        writer.submit(Comment("late"))
+    with pytest.raises(RuntimeError):
+        writer.write(Comment("late"))
+    # Closing again is a no-op
+    writer.close()
+
+
+def test_failed_batch(tmp_path, monkeypatch):
+    writer = LedgerWriter(str(tmp_path / "main.bean"), max_delay=0)
+
+    def broken(self):
+        raise RuntimeError("lock")
+    monkeypatch.setattr(FileLock, "__enter__", broken)
+    with pytest.raises(RuntimeError):
+        writer.submit(Comment("lost")).result(timeout=5)
+    monkeypatch.undo()
+    writer.write(Comment("kept"))
+    writer.close()
+    assert (tmp_path / "main.bean").read_text() == "; kept\n\n"